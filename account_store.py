@@ -0,0 +1,254 @@
+import asyncio
+import queue
+import sqlite3
+import threading
+
+try:
+    from motor.motor_asyncio import AsyncIOMotorClient
+except ImportError:
+    AsyncIOMotorClient = None
+
+
+# Seconds a caller waits for an account lookup
+STORE_TIMEOUT = 5
+
+
+class MongoAccountStore:
+    # Uses Motor when installed, otherwise pymongo calls run on the loop's
+    # executor. Both clients keep a connection pool of the configured size.
+
+    def __init__(self, uri, database, min_pool_size=0, max_pool_size=100):
+        self.uri = uri
+        self.database = database
+        self.min_pool_size = min_pool_size
+        self.max_pool_size = max_pool_size
+        self.collection = None
+
+    async def connect(self):
+        if AsyncIOMotorClient is not None:
+            client = AsyncIOMotorClient(
+                self.uri, minPoolSize=self.min_pool_size, maxPoolSize=self.max_pool_size
+            )
+        else:
+            from pymongo import MongoClient
+
+            client = MongoClient(
+                self.uri, minPoolSize=self.min_pool_size, maxPoolSize=self.max_pool_size
+            )
+        self.collection = client[self.database]["accounts"]
+
+    async def call(self, method, *args, **kwargs):
+        if AsyncIOMotorClient is not None:
+            return await getattr(self.collection, method)(*args, **kwargs)
+        return await asyncio.get_running_loop().run_in_executor(
+            None, lambda: getattr(self.collection, method)(*args, **kwargs)
+        )
+
+    async def ensure_indexes(self):
+        await self.call("create_index", "token", unique=True)
+
+    async def find_by_token(self, token):
+        account = await self.call("find_one", {"token": token})
+        if not account:
+            return None
+        return {
+            "api_id": account["id"],
+            "account_id": account["account_id"],
+            "password": account["password"],
+            "broker_name": account["broker_name"],
+        }
+
+    async def save(self, api_id, token, account_id, password, broker_name):
+        await self.call(
+            "update_one",
+            {"id": api_id},
+            {
+                "$set": {
+                    "token": token,
+                    "account_id": account_id,
+                    "password": password,
+                    "broker_name": broker_name,
+                }
+            },
+            upsert=True,
+        )
+
+
+class SqliteAccountStore:
+    # Same accounts table as login_data.db, queries run on the loop's executor
+    # with connections taken from a small pool
+
+    def __init__(self, path, pool_size=4, wal=False):
+        self.path = path
+        self.pool_size = pool_size
+        self.wal = wal
+        self.connections = queue.Queue()
+
+    async def connect(self):
+        for _ in range(self.pool_size):
+            connection = sqlite3.connect(self.path, check_same_thread=False)
+            # Readers do not wait for the writer. The mode is stored in the
+            # database file, so it is only set when asked for.
+            if self.wal:
+                connection.execute("PRAGMA journal_mode=WAL")
+            self.connections.put(connection)
+
+    def execute(self, sql, params=()):
+        connection = self.connections.get()
+        try:
+            with connection:
+                return connection.execute(sql, params).fetchone()
+        finally:
+            self.connections.put(connection)
+
+    async def run(self, sql, params=()):
+        return await asyncio.get_running_loop().run_in_executor(
+            None, self.execute, sql, params
+        )
+
+    async def ensure_indexes(self):
+        await self.run(
+            """CREATE TABLE IF NOT EXISTS accounts (
+                id TEXT PRIMARY KEY,
+                token TEXT NOT NULL,
+                account_id INTEGER NOT NULL,
+                password TEXT NOT NULL,
+                broker_name TEXT NOT NULL
+            )"""
+        )
+        await self.run(
+            "CREATE UNIQUE INDEX IF NOT EXISTS accounts_token ON accounts (token)"
+        )
+
+    async def find_by_token(self, token):
+        row = await self.run(
+            "SELECT id, account_id, password, broker_name FROM accounts WHERE token = ?",
+            (token,),
+        )
+        if not row:
+            return None
+        return {
+            "api_id": row[0],
+            "account_id": row[1],
+            "password": row[2],
+            "broker_name": row[3],
+        }
+
+    async def save(self, api_id, token, account_id, password, broker_name):
+        await self.run(
+            """INSERT INTO accounts (id, token, account_id, password, broker_name)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (id) DO UPDATE SET token = excluded.token,
+                account_id = excluded.account_id, password = excluded.password,
+                broker_name = excluded.broker_name""",
+            (str(api_id), token, account_id, password, broker_name),
+        )
+
+
+class MemoryAccountStore:
+    # Local stand-in for tests and benchmarks, nothing is persisted
+
+    def __init__(self):
+        self.accounts = {}
+
+    async def connect(self):
+        pass
+
+    async def ensure_indexes(self):
+        pass
+
+    async def find_by_token(self, token):
+        for api_id, account in self.accounts.items():
+            if account["token"] == token:
+                return {
+                    "api_id": api_id,
+                    "account_id": account["account_id"],
+                    "password": account["password"],
+                    "broker_name": account["broker_name"],
+                }
+        return None
+
+    async def save(self, api_id, token, account_id, password, broker_name):
+        self.accounts[api_id] = {
+            "token": token,
+            "account_id": account_id,
+            "password": password,
+            "broker_name": broker_name,
+        }
+
+
+class AccountStore:
+    # Account and token storage. The backend runs on its own event loop
+    # thread, callers on any thread wait for the returned future or await it.
+
+    def __init__(self):
+        self.backend = None
+        self.loop = None
+        self.lock = threading.Lock()
+
+    def open(self, backend=None, **options):
+        with self.lock:
+            if self.backend is not None:
+                return
+            if backend is None:
+                from config import Config
+
+                backend = Config.ACCOUNT_STORE
+                options = {
+                    "mongo": {
+                        "uri": Config.MONGO_URI,
+                        "database": Config.MONGO_DB,
+                        "min_pool_size": Config.MONGO_MIN_POOL_SIZE,
+                        "max_pool_size": Config.MONGO_MAX_POOL_SIZE,
+                    },
+                    "sqlite": {
+                        "path": Config.SQLITE_PATH,
+                        "pool_size": Config.SQLITE_POOL_SIZE,
+                        "wal": Config.SQLITE_WAL,
+                    },
+                }.get(backend, {})
+
+            if backend == "mongo":
+                store = MongoAccountStore(**options)
+            elif backend == "sqlite":
+                store = SqliteAccountStore(**options)
+            elif backend == "memory":
+                store = MemoryAccountStore()
+            else:
+                raise ValueError(f"Unknown account store: {backend}")
+
+            self.loop = asyncio.new_event_loop()
+            threading.Thread(target=self.loop.run_forever, daemon=True).start()
+            asyncio.run_coroutine_threadsafe(store.connect(), self.loop).result()
+            self.backend = store
+
+    def submit(self, method, *args):
+        # Returns a concurrent.futures.Future, async callers wrap it
+        if self.backend is None:
+            self.open()
+        return asyncio.run_coroutine_threadsafe(
+            getattr(self.backend, method)(*args), self.loop
+        )
+
+    def ensure_indexes(self):
+        future = self.submit("ensure_indexes")
+        future.add_done_callback(log_store_error)
+        return future
+
+    def find_by_token(self, token):
+        return self.submit("find_by_token", token).result(STORE_TIMEOUT)
+
+    def save(self, api_id, token, account_id, password, broker_name):
+        # Failures are logged here, save_account_token also waits for the
+        # write and reports them to the login request
+        future = self.submit("save", api_id, token, account_id, password, broker_name)
+        future.add_done_callback(log_store_error)
+        return future
+
+
+def log_store_error(future):
+    if future.exception() is not None:
+        print(f"Account store error: {future.exception()}")
+
+
+account_store = AccountStore()
@@ -1,15 +1,51 @@
 import time
-from app import create_app
+
+from app import create_app, create_asgi_app
 from dotenv import dotenv_values
-from mt5 import setup_account, terminate_all_metatrader5, remove_all_account
+from account_store import account_store
+from mt5 import (
+    list_account_ids,
+    terminate_all_metatrader5,
+    remove_all_account,
+)
+from terminal_images import terminal_images
+from terminal_pool import terminal_pool
 
 config = dotenv_values(".env")
 
+
+def start_terminals(app):
+    reuse_ids = []
+    if app.config.get("WARM_RESTART"):
+        # Workers attach again to the terminals of the previous run
+        reuse_ids = list_account_ids()
+        print(f"Warm restart, reusing {len(reuse_ids)} terminal(s)")
+    else:
+        terminate_all_metatrader5()
+        remove_all_account()
+
+    terminal_images.start(
+        int(time.time()),
+        app.config.get("TERMINAL_SPARE_IMAGES"),
+        app.config.get("TERMINAL_PROVISION_MODE"),
+        reuse_ids,
+    )
+    terminal_pool.start(app.config.get("TERMINAL_POOL_SIZE"))
+    terminal_pool.supervise(app.config.get("TERMINAL_PROBE_INTERVAL"))
+
+
 if __name__ == "__main__":
-    remove_all_account()
-    time.sleep(2)
-    terminate_all_metatrader5()
-    setup_account()
     APP_ENV = config.get("APP_ENV") or "default"
     app = create_app(APP_ENV)
-    app.run(host="0.0.0.0", port=app.config.get("PORT"))
\ No newline at end of file
+    # The store opens on its first call, building the indexes in the
+    # background, requests do not wait for it
+    account_store.ensure_indexes()
+    start_terminals(app)
+    if app.config.get("SERVER") == "asgi":
+        import uvicorn
+
+        uvicorn.run(
+            create_asgi_app(APP_ENV), host="0.0.0.0", port=int(app.config.get("PORT"))
+        )
+    else:
+        app.run(host="0.0.0.0", port=app.config.get("PORT"))
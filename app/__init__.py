@@ -1,10 +1,19 @@
 from flask import Flask
 from config import config
 from .api import register_apis_routes
+from .json_provider import OrjsonProvider, orjson
+from .asgi import AsgiApp
 
 
 def create_app(app_env="default"):
     app = Flask(__name__)
     app.config.from_object(config[app_env])
+    if app.config.get("JSON_BACKEND") == "orjson" and orjson is not None:
+        app.json = OrjsonProvider(app)
     register_apis_routes(app)
     return app
+
+
+def create_asgi_app(app_env="default"):
+    # Same routes, served by an ASGI server such as uvicorn
+    return AsgiApp(create_app(app_env))
@@ -2,11 +2,15 @@
 # from .thumb import thumb_routes_bp
 # from .user import user_routes_bp
 from .accounts import account_routes_bp
+from .stream import stream_routes_bp
+from .metrics import metrics_routes_bp
 # from .merge_video import merge_video_routes_bp
 
 
 def register_apis_routes(app):
     app.register_blueprint(account_routes_bp, url_prefix="/api/v1/account")
+    app.register_blueprint(stream_routes_bp, url_prefix="/api/v1/stream")
+    app.register_blueprint(metrics_routes_bp)
     # app.register_blueprint(merge_video_routes_bp, url_prefix="/api/v1/merge/video")
     # app.register_blueprint(thumb_routes_bp, url_prefix="/api/v1/thumb")
     # app.register_blueprint(user_routes_bp, url_prefix="/api/v1/user")
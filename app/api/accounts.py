@@ -1,58 +1,524 @@
-import MetaTrader5 as mt5
-from flask import Blueprint, request, jsonify, g
-from threading import Lock
+from flask import Blueprint, current_app, request, jsonify, g
 import datetime
+import time
 
 account_routes_bp = Blueprint("account_routes", __name__)
 from mt5 import (
-    mt5_login_account,
+    mt5,
+    check_mt5_order_fields,
     get_account_by_token,
-    place_mt5_order,
-    get_mt5_positions,
-    get_subscribed_symbols,
-    get_mt5_symbol_info,
-    get_mt5_account_info,
-    close_positions_by_ticket_id,
+    get_account_info_snapshot,
+    save_account_token,
 )
+from metrics import record_request
+from order_queue import order_queue
+from terminal_pool import terminal_pool
 
 
-# Create a global lock
-global_lock = Lock()
+# Longest time /order_status may wait for a queued order to finish
+MAX_ORDER_STATUS_WAIT = 30
+
+
+# Route logic is shared by the Flask views below and the ASGI front-end
+# (app/asgi.py). A route is a generator: it yields the steps that wait, a
+# token lookup, a terminal call, ..., gets their result back and returns
+# (payload, status). Flask runs the steps on the request thread, the ASGI
+# front-end awaits them on the event loop.
+
+
+def lookup_token(token):
+    return ("auth", token)
+
+
+def terminal(account, func_name, *args, **kwargs):
+    # Runs on the terminal worker that owns the account
+    return ("terminal", account, func_name, args, kwargs)
+
+
+def worker_call(worker, func_name, *args, **kwargs):
+    # Runs on the given terminal worker, not tied to an account
+    return ("worker", worker, func_name, args, kwargs)
+
+
+def account_info(account):
+    # Short lived account info snapshot, shared by bursts of polls
+    return ("account_info", account)
+
+
+def wait_for_job(job, timeout):
+    return ("wait_for_job", job, timeout)
+
+
+def authenticate(req):
+    token = req.headers.get("Authorization")
+    if not token:
+        return None, ({"error": "Missing required fields: token"}, 400)
+
+    token_info = yield lookup_token(token)
+    if not token_info:
+        return None, ({"error": "Invalid token: need to re-login"}, 400)
+    if token_info.get("success") is False:
+        # Store error, not credentials: answer it instead of calling a terminal
+        return None, (token_info, 200)
+    return token_info, None
+
+
+def get_json_body(req):
+    data = req.get_json(silent=True)
+    if not isinstance(data, dict):
+        return None, ({"error": "Invalid JSON body"}, 400)
+    return data, None
+
+
+def parse_order(data, api_id):
+    order = {
+        "action": data.get("action", None),
+        "magic": data.get("magic", None),
+        "order": data.get("order", None),
+        "symbol": data.get("symbol", None),
+        "volume": data.get("volume", None),
+        "price": data.get("price", None),
+        "stoplimit": data.get("stoplimit", None),
+        "sl": data.get("sl", None),
+        "tp": data.get("tp", None),
+        "deviation": data.get("deviation", None),
+        "order_type": data.get("order_type", None),
+        "type_filling": data.get("type_filling", None),
+        "type_time": data.get("type_time", None),
+        "expiration": data.get("expiration", None),
+        "comment": data.get("comment", f"api_id = {api_id} BY Nextlevelbot"),
+        "position": data.get("position", None),
+        "position_by": data.get("position_by", None),
+    }
+
+    # Resolve MetaTrader5 constant names, e.g. "TRADE_ACTION_DEAL"
+    for field in ["action", "order_type", "type_filling", "type_time"]:
+        if order[field] is not None:
+            order[field] = getattr(mt5, order[field])
+
+    return order
+
+
+def positions_query(args):
+    # Field projection, e.g. fields=ticket,profit
+    fields = args.get("fields")
+    fields = [field for field in fields.split(",") if field] if fields else None
+    return {
+        "symbol": args.get("symbol"),
+        "order_type": args.get("type"),
+        "magic": args.get("magic", type=int),
+        # format=columnar returns one list per field instead of one dict per position
+        "columnar": args.get("format") == "columnar",
+        "group": args.get("group"),
+        "ticket_from": args.get("ticket_from", type=int),
+        "ticket_to": args.get("ticket_to", type=int),
+        "min_profit": args.get("min_profit", type=float),
+        "max_profit": args.get("max_profit", type=float),
+        # Unix timestamp, only positions opened at or after it
+        "since": args.get("since", type=int),
+        "cursor": args.get("cursor", type=int),
+        "limit": args.get("limit", type=int),
+        "fields": fields,
+    }
+
+
+def queue_order(token_info, order, idempotency_key):
+    # Async mode: validate, queue for the terminal worker and return a job id
+    error = check_mt5_order_fields(
+        order["action"],
+        order["magic"],
+        order["symbol"],
+        order["volume"],
+        order["price"],
+        order["order_type"],
+        order["type_filling"],
+        order["type_time"],
+    )
+    if error:
+        return error
+
+    job, created = order_queue.submit(token_info, order, idempotency_key)
+    return {
+        "success": True,
+        "message": "Order queued" if created else "Order already queued",
+        "data": job.to_dict(),
+    }
+
+
+def find_order_job(job_id, token_info):
+    # Jobs are only visible to the account that queued them
+    job = order_queue.get(job_id)
+    if job is None or job.account_id != token_info.get("account_id"):
+        return None
+    return job
+
+
+def order_job_status(job):
+    return {"success": True, "message": f"Order {job.status}", "data": job.to_dict()}
+
+
+def parse_orders(orders, api_id):
+    # Orders with unknown constants fail on their own, the rest are sent
+    results = [None] * len(orders)
+    parsed_orders = []
+    for index, order_data in enumerate(orders):
+        try:
+            parsed_orders.append((index, parse_order(order_data, api_id)))
+        except AttributeError as e:
+            results[index] = {"success": False, "message": f"Invalid order: {e}"}
+    return results, parsed_orders
+
+
+def merge_order_results(results, parsed_orders, response):
+    if not response.get("success") and "data" not in response:
+        return response
+
+    for (index, _), result in zip(parsed_orders, response["data"]["results"]):
+        results[index] = result
+
+    placed = sum(1 for result in results if result["success"])
+    return {
+        "success": placed == len(results),
+        "message": f"{placed} of {len(results)} orders placed",
+        "data": {
+            "results": results,
+            "time": response["data"]["time"],
+        },
+    }
+
+
+def close_positions_call(data, api_id):
+    # Returns the terminal call (func_name, args, kwargs), or an error when
+    # neither a ticket nor a filter is given
+    ticket_id = data.get("ticket_id")
+    volume = data.get("volume", None)
+    deviation = data.get("deviation", 20)
+    comment = data.get("comment", f"api_id = {api_id} BY Nextlevelbot")
+
+    # Bulk mode: close every position matching the filters in one call
+    if ticket_id is None:
+        symbol = data.get("symbol")
+        order_type = data.get("type")
+        magic = data.get("magic")
+        tickets = data.get("tickets")
+        # An empty tickets list is a filter that matches nothing, never "all"
+        if not any(
+            [symbol, order_type, magic is not None, tickets is not None, data.get("all")]
+        ):
+            return None, {
+                "error": "Missing required fields: ticket_id OR symbol, type, magic, tickets, all"
+            }
+        return (
+            "close_mt5_positions",
+            (),
+            {
+                "symbol": symbol,
+                "order_type": order_type,
+                "magic": int(magic) if magic is not None else None,
+                "tickets": (
+                    [int(ticket) for ticket in tickets] if tickets is not None else None
+                ),
+                "deviation": deviation,
+                "comment": comment,
+            },
+        ), None
+
+    return (
+        "close_positions_by_ticket_id",
+        (int(ticket_id),),
+        {"volume": volume, "deviation": deviation, "comment": comment},
+    ), None
+
+
+def handle_get_terminal_stats(req):
+    token_info, error = yield from authenticate(req)
+    if error:
+        return error
+
+    terminals = []
+    for worker in list(terminal_pool.workers):
+        stats = {}
+        if worker.available:
+            stats = yield worker_call(worker, "get_login_stats")
+        terminals.append(
+            {
+                "terminal_id": worker.terminal_id,
+                "available": worker.available,
+                "accounts": len(worker.accounts),
+                **stats.get("data", {}),
+            }
+        )
+
+    return {
+        "success": True,
+        "message": "Terminal stats",
+        "data": {"terminals": terminals},
+    }, 200
+
+
+def handle_get_account(req):
+    if not req.headers.get("Authorization"):
+        return {"error": "Invalid token: need to re-login"}, 400
+
+    token_info, error = yield from authenticate(req)
+    if error:
+        return error
+    return token_info, 200
+
+
+def handle_get_account_info(req):
+    token_info, error = yield from authenticate(req)
+    if error:
+        return error
+    response = yield account_info(token_info)
+    return response, 200
+
+
+def handle_place_order(req):
+    token_info, error = yield from authenticate(req)
+    if error:
+        return error
+    data, error = get_json_body(req)
+    if error:
+        return error
+    order = parse_order(data, token_info.get("api_id"))
+
+    if data.get("async"):
+        idempotency_key = req.headers.get("Idempotency-Key") or data.get(
+            "idempotency_key"
+        )
+        return queue_order(token_info, order, idempotency_key), 200
+
+    response = yield terminal(token_info, "place_mt5_order", **order)
+    return response, 200
+
+
+def handle_order_status(req, job_id):
+    token_info, error = yield from authenticate(req)
+    if error:
+        return error
+
+    job = find_order_job(job_id, token_info)
+    if job is None:
+        return {"success": False, "message": "Order job not found."}, 404
+
+    # ?wait=seconds holds the request until the order is done (long polling)
+    wait = req.args.get("wait", type=float)
+    if wait:
+        yield wait_for_job(job, min(wait, MAX_ORDER_STATUS_WAIT))
+    return order_job_status(job), 200
+
+
+def handle_place_orders(req):
+    token_info, error = yield from authenticate(req)
+    if error:
+        return error
+    data, error = get_json_body(req)
+    if error:
+        return error
+
+    orders = data.get("orders")
+    if not isinstance(orders, list) or not orders:
+        return {"error": "Missing required fields: orders"}, 400
+
+    results, parsed_orders = parse_orders(orders, token_info.get("api_id"))
+    # One login and one terminal call for the whole batch
+    response = yield terminal(
+        token_info,
+        "place_mt5_orders",
+        [order for _, order in parsed_orders],
+        pipeline=data.get("pipeline", False),
+    )
+    return merge_order_results(results, parsed_orders, response), 200
+
+
+def handle_get_positions(req):
+    token_info, error = yield from authenticate(req)
+    if error:
+        return error
+    positions = yield terminal(
+        token_info, "get_mt5_positions", **positions_query(req.args)
+    )
+    return positions, 200
+
+
+def handle_get_subscribed_symbols(req):
+    token_info, error = yield from authenticate(req)
+    if error:
+        return error
+
+    # Reload the cached symbol metadata when ?refresh=true
+    refresh = req.args.get("refresh", "").lower() in ["1", "true"]
+    symbols = yield terminal(token_info, "get_subscribed_symbols", refresh=refresh)
+    return symbols, 200
+
+
+def handle_get_symbol_info(req):
+    token_info, error = yield from authenticate(req)
+    if error:
+        return error
+    symbol_info = yield terminal(
+        token_info, "get_mt5_symbol_info", symbol=req.args.get("symbol")
+    )
+    return symbol_info, 200
+
+
+def handle_get_symbol_ticks(req):
+    token_info, error = yield from authenticate(req)
+    if error:
+        return error
+
+    # Comma separated list of symbols, e.g. EURUSD,GBPUSD
+    symbols = req.args.get("symbols")
+    symbols = [symbol for symbol in symbols.split(",") if symbol] if symbols else []
+    if not symbols:
+        return {"error": "Missing required fields: symbols"}, 400
+
+    # Fetch the latest tick of every symbol with one login
+    ticks = yield terminal(token_info, "get_mt5_symbol_ticks", symbols)
+    return ticks, 200
+
+
+def handle_close_positions(req):
+    token_info, error = yield from authenticate(req)
+    if error:
+        return error
+    data, error = get_json_body(req)
+    if error:
+        return error
+
+    call, error = close_positions_call(data, token_info.get("api_id"))
+    if error:
+        return error, 400
+    func_name, args, kwargs = call
+    response = yield terminal(token_info, func_name, *args, **kwargs)
+    if func_name == "close_positions_by_ticket_id":
+        # Single closes keep their original response shape
+        response = {"success": response}
+    return response, 200
+
+
+def run_on_worker(worker, account, func_name, *args, **kwargs):
+    wait_start_time = datetime.datetime.now()
+    with worker.lock:
+        # Record the time spent waiting for the terminal
+        g.wait_time += (datetime.datetime.now() - wait_start_time).total_seconds()
+        start_time = time.perf_counter()
+        result = worker.call(account, func_name, *args, **kwargs)
+        add_timing("terminal", time.perf_counter() - start_time)
+        # Stages measured inside the terminal worker: initialize, login, ...
+        for stage, seconds in worker.last_timings.items():
+            add_timing(stage, seconds)
+        return result
+
+
+def run_on_terminal(account_id, account, func_name, *args, **kwargs):
+    # Only the terminal that owns this account is locked, accounts routed to
+    # other workers keep trading in parallel
+    worker = terminal_pool.worker_for(account_id)
+    if worker is None:
+        return {"success": False, "message": "No terminal available, try again later"}
+    return run_on_worker(worker, account, func_name, *args, **kwargs)
+
+
+def add_timing(stage, seconds):
+    g.timings[stage] = g.timings.get(stage, 0) + seconds
+
+
+def run_step(step):
+    kind = step[0]
+    if kind == "auth":
+        start_time = time.perf_counter()
+        token_info = get_account_by_token(step[1])
+        add_timing("auth", time.perf_counter() - start_time)
+        if token_info and "api_id" in token_info:
+            g.api_id = token_info["api_id"]
+        return token_info
+    if kind == "terminal":
+        _, account, func_name, args, kwargs = step
+        return run_on_terminal(
+            account.get("account_id"), account, func_name, *args, **kwargs
+        )
+    if kind == "worker":
+        _, worker, func_name, args, kwargs = step
+        return run_on_worker(worker, None, func_name, *args, **kwargs)
+    if kind == "account_info":
+        _, account = step
+        account_id = account.get("account_id")
+        return get_account_info_snapshot(
+            account_id,
+            account.get("broker_name"),
+            lambda: run_on_terminal(account_id, account, "get_mt5_account_info"),
+        )
+    if kind == "wait_for_job":
+        _, job, timeout = step
+        job.done.wait(timeout)
+        return None
+    raise ValueError(f"Unknown route step: {kind}")
+
+
+def run_route(route, *args):
+    # Runs a shared route on the request thread
+    steps = route(request, *args)
+    result = None
+    while True:
+        try:
+            step = steps.send(result)
+        except StopIteration as stop:
+            payload, status = stop.value
+            return json_response(payload), status
+        result = run_step(step)
 
 
 @account_routes_bp.before_request
 def before_request():
-    # Record the time when the request starts waiting
-    g.wait_start_time = datetime.datetime.now()
-    global_lock.acquire()
-    # Record the time when the request starts processing
-    g.process_start_time = datetime.datetime.now()
+    g.wait_time = 0
+    g.timings = {}
+    g.api_id = None
+    g.request_start_time = time.perf_counter()
 
 
 @account_routes_bp.after_request
 def after_request(response):
-    # Calculate the wait time
-    wait_time = (g.process_start_time - g.wait_start_time).total_seconds()
-    # Add the wait time to the response JSON
-    response_json = response.get_json()
-    response_json["wait_time"] = wait_time
-    response.set_data(jsonify(response_json).get_data())
-
-    # Release the lock
-    global_lock.release()
+    # The body already carries wait_time, also expose it as a header
+    response.headers["X-Wait-Time"] = str(g.wait_time)
+
+    # Per-stage latency histograms, exported on /metrics
+    record_request(
+        request.endpoint,
+        g.api_id if g.api_id is not None else "",
+        time.perf_counter() - g.request_start_time,
+        g.wait_time,
+        g.timings,
+        current_app.config.get("SLOW_REQUEST_SECONDS"),
+    )
+    return response
+
+
+def json_response(payload):
+    # Add the wait time before serializing, so the body is encoded only once
+    start_time = time.perf_counter()
+    response = jsonify({**payload, "wait_time": g.wait_time})
+    add_timing("serialization", time.perf_counter() - start_time)
     return response
 
 
 @account_routes_bp.route("")
 @account_routes_bp.route("/")
 def index():
-    return jsonify({"success": "API running"}), 200
+    return json_response({"success": "API running"}), 200
+
+
+@account_routes_bp.route("/get_terminal_stats", methods=["GET"])
+def get_terminal_stats():
+    return run_route(handle_get_terminal_stats)
 
 
 @account_routes_bp.route("/login_account", methods=["POST"])
 def login_account():
     data = request.get_json()
     api_id = data.get("api_id")
+    g.api_id = api_id
     account_id = data.get("account_id")
     account_id = int(account_id)
     password = data.get("password")
@@ -60,281 +526,76 @@ def login_account():
 
     if not api_id or not account_id or not password or not broker_name:
         return (
-            jsonify(
+            json_response(
                 {
                     "error": "Missing required fields: api_id, account_id, password OR broker_name"
                 }
             ),
             200,
         )
-    response = mt5_login_account(api_id, account_id, password, broker_name)
-    return jsonify(response), 200
+    response = run_on_terminal(
+        account_id,
+        None,
+        "mt5_login_account",
+        api_id,
+        account_id,
+        password,
+        broker_name,
+    )
+    if response.get("success"):
+        error = save_account_token(
+            api_id, response["data"]["token"], account_id, password, broker_name
+        )
+        if error:
+            return json_response(error), 200
+    return json_response(response), 200
 
 
 @account_routes_bp.route("/get_account", methods=["GET"])
 def get_account():
-    # data = request.get_json()
-    # token = data.get("token")
-    token = request.headers.get("Authorization")
-
-    if not token:
-        return (
-            jsonify({"error": "Invalid token: need to re-login"}),
-            400,
-        )
-
-    response = get_account_by_token(token)
-    return jsonify(response), 200
+    return run_route(handle_get_account)
 
 
 @account_routes_bp.route("/get_account_info", methods=["GET"])
 def get_account_info():
-    token = request.headers.get("Authorization")
-
-    if not token:
-        return (
-            jsonify({"error": "Missing required fields: token"}),
-            400,
-        )
-    toke_info = get_account_by_token(token)
-    if not toke_info:
-        return (
-            jsonify({"error": "Invalid token: need to re-login"}),
-            400,
-        )
-    api_id = toke_info.get("api_id")
-    account_id = toke_info.get("account_id")
-    password = toke_info.get("password")
-    broker_name = toke_info.get("broker_name")
-    if not mt5.login(login=account_id, password=password, server=broker_name):
-        error_code, error_message = mt5.last_error()
-        return {
-            "success": False,
-            "message": f"Login failed, error code = {error_code}, message = {error_message}",
-        }
-    response = get_mt5_account_info()
-    return jsonify(response), 200
+    return run_route(handle_get_account_info)
 
 
 @account_routes_bp.route("/place_order", methods=["POST"])
 def place_order():
-    token = request.headers.get("Authorization")
-
-    if not token:
-        return (
-            jsonify({"error": "Missing required fields: token"}),
-            400,
-        )
-    toke_info = get_account_by_token(token)
-    if not toke_info:
-        return (
-            jsonify({"error": "Invalid token: need to re-login"}),
-            400,
-        )
-    api_id = toke_info.get("api_id")
-    account_id = toke_info.get("account_id")
-    password = toke_info.get("password")
-    broker_name = toke_info.get("broker_name")
-
-    data = request.get_json()
-    action = data.get("action", None)
-    magic = data.get("magic", None)
-    order = data.get("order", None)
-    symbol = data.get("symbol", None)
-    volume = data.get("volume", None)
-    price = data.get("price", None)
-    stoplimit = data.get("stoplimit", None)
-    sl = data.get("sl", None)
-    tp = data.get("tp", None)
-    deviation = data.get("deviation", None)
-    order_type = data.get("order_type", None)
-    type_filling = data.get("type_filling", None)
-    type_time = data.get("type_time", None)
-    expiration = data.get("expiration", None)
-    comment = data.get("comment", f"api_id = {api_id} BY Nextlevelbot")
-    position = data.get("position", None)
-    position_by = data.get("position_by", None)
-
-    if action is not None:
-        action = getattr(mt5, action)
-
-    if order_type is not None:
-        order_type = getattr(mt5, order_type)
-
-    if type_filling is not None:
-        type_filling = getattr(mt5, type_filling)
-
-    if type_time is not None:
-        type_time = getattr(mt5, type_time)
-
-    if not mt5.login(login=account_id, password=password, server=broker_name):
-        error_code, error_message = mt5.last_error()
-        return {
-            "success": False,
-            "message": f"Login failed, error code = {error_code}, message = {error_message}",
-        }
-    response = place_mt5_order(
-        action,
-        magic,
-        order,
-        symbol,
-        volume,
-        price,
-        stoplimit,
-        sl,
-        tp,
-        deviation,
-        order_type,
-        type_filling,
-        type_time,
-        expiration,
-        comment,
-        position,
-        position_by,
-    )
-    return jsonify(response), 200
-
-
-@account_routes_bp.route("/get_positions", methods=["GET"])
-def get_positions():
-    # Get the token from the request headers
-    token = request.headers.get("Authorization")
-    if not token:
-        return jsonify({"error": "Missing required fields: token"}), 400
+    return run_route(handle_place_order)
 
-    # Retrieve account information using the token
-    token_info = get_account_by_token(token)
-    if not token_info:
-        return jsonify({"error": "Invalid token: need to re-login"}), 400
 
-    # Extract account details
-    api_id = token_info.get("api_id")
-    account_id = token_info.get("account_id")
-    password = token_info.get("password")
-    broker_name = token_info.get("broker_name")
+@account_routes_bp.route("/order_status/<job_id>", methods=["GET"])
+def order_status(job_id):
+    return run_route(handle_order_status, job_id)
 
-    # Login to MetaTrader 5 using the provided credentials
-    if not mt5.login(login=account_id, password=password, server=broker_name):
-        error_code, error_message = mt5.last_error()
-        return {
-            "success": False,
-            "message": f"Login failed, error code = {error_code}, message = {error_message}",
-        }
 
-    # Get query parameters for type and symbol
-    order_type = request.args.get("type")
-    symbol = request.args.get("symbol")
+@account_routes_bp.route("/place_orders", methods=["POST"])
+def place_orders():
+    return run_route(handle_place_orders)
 
-    # Fetch positions based on type and symbol
-    positions = get_mt5_positions(symbol=symbol, order_type=order_type)
 
-    # Return the positions as a JSON response
-    return jsonify(positions), 200
+@account_routes_bp.route("/get_positions", methods=["GET"])
+def get_positions():
+    return run_route(handle_get_positions)
 
 
 @account_routes_bp.route("/get_subscribed_symbols", methods=["GET"])
 def get_subscribed_symbols_route():
-    # Get the token from the request headers
-    token = request.headers.get("Authorization")
-    if not token:
-        return jsonify({"error": "Missing required fields: token"}), 400
-
-    # Retrieve account information using the token
-    token_info = get_account_by_token(token)
-    if not token_info:
-        return jsonify({"error": "Invalid token: need to re-login"}), 400
-
-    # Extract account details
-    api_id = token_info.get("api_id")
-    account_id = token_info.get("account_id")
-    password = token_info.get("password")
-    broker_name = token_info.get("broker_name")
-
-    # Login to MetaTrader 5 using the provided credentials
-    if not mt5.login(login=account_id, password=password, server=broker_name):
-        error_code, error_message = mt5.last_error()
-        return {
-            "success": False,
-            "message": f"Login failed, error code = {error_code}, message = {error_message}",
-        }
-
-    # Get the subscribed symbols
-    symbols_response = get_subscribed_symbols()
-
-    return jsonify(symbols_response), 200
+    return run_route(handle_get_subscribed_symbols)
 
 
 @account_routes_bp.route("/get_symbol_info", methods=["GET"])
 def get_symbol_info():
-    # Get the token from the request headers
-    token = request.headers.get("Authorization")
-    if not token:
-        return jsonify({"error": "Missing required fields: token"}), 400
-
-    # Retrieve account information using the token
-    token_info = get_account_by_token(token)
-    if not token_info:
-        return jsonify({"error": "Invalid token: need to re-login"}), 400
+    return run_route(handle_get_symbol_info)
 
-    # Extract account details
-    api_id = token_info.get("api_id")
-    account_id = token_info.get("account_id")
-    password = token_info.get("password")
-    broker_name = token_info.get("broker_name")
 
-    # Login to MetaTrader 5 using the provided credentials
-    if not mt5.login(login=account_id, password=password, server=broker_name):
-        error_code, error_message = mt5.last_error()
-        return {
-            "success": False,
-            "message": f"Login failed, error code = {error_code}, message = {error_message}",
-        }
-
-    # Get query parameters for type and symbol
-    symbol = request.args.get("symbol")
-
-    # Fetch positions based on type and symbol
-    positions = get_mt5_symbol_info(symbol=symbol)
-
-    # Return the positions as a JSON response
-    return jsonify(positions), 200
+@account_routes_bp.route("/get_symbol_ticks", methods=["GET"])
+def get_symbol_ticks():
+    return run_route(handle_get_symbol_ticks)
 
 
 @account_routes_bp.route("/close_positions", methods=["POST"])
 def close_positions():
-    # Get the token from the request headers
-    token = request.headers.get("Authorization")
-    if not token:
-        return jsonify({"error": "Missing required fields: token"}), 400
-
-    # Retrieve account information using the token
-    token_info = get_account_by_token(token)
-    if not token_info:
-        return jsonify({"error": "Invalid token: need to re-login"}), 400
-
-    # Extract account details
-    api_id = token_info.get("api_id")
-    account_id = token_info.get("account_id")
-    password = token_info.get("password")
-    broker_name = token_info.get("broker_name")
-
-    # Login to MetaTrader 5 using the provided credentials
-    if not mt5.login(login=account_id, password=password, server=broker_name):
-        error_code, error_message = mt5.last_error()
-        return {
-            "success": False,
-            "message": f"Login failed, error code = {error_code}, message = {error_message}",
-        }
-
-    data = request.json
-    ticket_id = data.get("ticket_id")
-    ticket_id = int(ticket_id)
-    volume = data.get("volume", None)
-    deviation = data.get("deviation", 20)
-    comment = data.get("comment", f"api_id = {api_id} BY Nextlevelbot")
-
-    success = close_positions_by_ticket_id(
-        ticket_id, volume=volume, deviation=deviation, comment=comment
-    )
-
-    return jsonify({"success": success})
+    return run_route(handle_close_positions)
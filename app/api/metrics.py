@@ -0,0 +1,9 @@
+from flask import Blueprint, Response
+
+metrics_routes_bp = Blueprint("metrics_routes", __name__)
+from metrics import render_metrics
+
+
+@metrics_routes_bp.route("/metrics", methods=["GET"])
+def metrics():
+    return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
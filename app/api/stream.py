@@ -0,0 +1,219 @@
+import asyncio
+import json
+import queue
+import threading
+import time
+from flask import Blueprint, Response, request, jsonify
+
+stream_routes_bp = Blueprint("stream_routes", __name__)
+from mt5 import get_account_by_token
+from terminal_pool import terminal_pool
+
+
+# Seconds between two upstream reads of a streamed account
+STREAM_INTERVAL = 1
+# Seconds without events before a keep-alive comment is sent
+KEEPALIVE_INTERVAL = 15
+SUBSCRIBER_QUEUE_SIZE = 100
+
+pollers = {}
+pollers_lock = threading.Lock()
+
+
+class Subscriber:
+    def __init__(self, symbols, loop=None):
+        self.symbols = set(symbols)
+        self.queue = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        # ASGI subscribers wait on an asyncio event instead of the queue
+        self.loop = loop
+        self.wakeup = asyncio.Event() if loop is not None else None
+
+    def notify(self):
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.wakeup.set)
+
+
+class AccountPoller:
+    # One background thread per streamed account reads positions and ticks
+    # once per interval and pushes the diffs to every subscriber
+
+    def __init__(self, account):
+        self.account = account
+        self.account_id = account["account_id"]
+        self.subscribers = []
+        self.lock = threading.Lock()
+        self.positions = {}
+        self.ticks = {}
+        # Snapshots are only sent once the first poll has filled the state
+        self.polled = False
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def subscribe(self, subscriber):
+        with self.lock:
+            self.subscribers.append(subscriber)
+            if self.polled:
+                subscriber.queue.put_nowait(self.snapshot_event(subscriber))
+                subscriber.notify()
+
+    def unsubscribe(self, subscriber):
+        with self.lock:
+            self.subscribers.remove(subscriber)
+
+    def snapshot_event(self, subscriber):
+        return {
+            "type": "snapshot",
+            "positions": list(self.positions.values()),
+            "ticks": {
+                symbol: tick
+                for symbol, tick in self.ticks.items()
+                if symbol in subscriber.symbols
+            },
+        }
+
+    def publish(self, subscriber, event):
+        try:
+            subscriber.queue.put_nowait(event)
+        except queue.Full:
+            # Slow client, replace its backlog with a fresh snapshot
+            with subscriber.queue.mutex:
+                subscriber.queue.queue.clear()
+            subscriber.queue.put_nowait(self.snapshot_event(subscriber))
+        subscriber.notify()
+
+    def poll(self, symbols):
+        worker = terminal_pool.worker_for(self.account_id)
+        if worker is None:
+            return {"success": False, "message": "No terminal available"}
+        with worker.lock:
+            return worker.call(
+                self.account, "get_mt5_stream_snapshot", sorted(symbols)
+            )
+
+    def run(self):
+        first_poll = True
+        while True:
+            # The first poll runs right away, it makes the initial snapshot
+            if not first_poll:
+                time.sleep(STREAM_INTERVAL)
+            first_poll = False
+
+            # Stop polling once the last subscriber is gone
+            with pollers_lock:
+                with self.lock:
+                    if not self.subscribers:
+                        if pollers.get(self.account_id) is self:
+                            del pollers[self.account_id]
+                        return
+
+            with self.lock:
+                symbols = set()
+                for subscriber in self.subscribers:
+                    symbols |= subscriber.symbols
+
+            snapshot = self.poll(symbols)
+
+            with self.lock:
+                if not snapshot.get("success"):
+                    for subscriber in self.subscribers:
+                        self.publish(
+                            subscriber,
+                            {"type": "error", "message": snapshot.get("message")},
+                        )
+                    continue
+
+                positions = {
+                    position["ticket"]: position
+                    for position in snapshot["data"]["positions"]
+                }
+                changed = [
+                    position
+                    for ticket, position in positions.items()
+                    if self.positions.get(ticket) != position
+                ]
+                removed = [ticket for ticket in self.positions if ticket not in positions]
+                ticks = {
+                    symbol: tick
+                    for symbol, tick in snapshot["data"]["ticks"].items()
+                    if self.ticks.get(symbol) != tick
+                }
+                self.positions = positions
+                self.ticks.update(ticks)
+
+                if not self.polled:
+                    self.polled = True
+                    for subscriber in self.subscribers:
+                        self.publish(subscriber, self.snapshot_event(subscriber))
+                    continue
+
+                for subscriber in self.subscribers:
+                    subscriber_ticks = {
+                        symbol: tick
+                        for symbol, tick in ticks.items()
+                        if symbol in subscriber.symbols
+                    }
+                    if changed or removed or subscriber_ticks:
+                        self.publish(
+                            subscriber,
+                            {
+                                "type": "update",
+                                "positions": {"changed": changed, "removed": removed},
+                                "ticks": subscriber_ticks,
+                            },
+                        )
+
+
+def format_event(event):
+    return f"data: {json.dumps(event)}\n\n"
+
+
+def subscribe(account, symbols, loop=None):
+    subscriber = Subscriber(symbols, loop)
+    with pollers_lock:
+        poller = pollers.get(account["account_id"])
+        if poller is None:
+            poller = AccountPoller(account)
+            pollers[account["account_id"]] = poller
+            poller.subscribe(subscriber)
+            poller.thread.start()
+        else:
+            poller.subscribe(subscriber)
+    return poller, subscriber
+
+
+@stream_routes_bp.route("/events", methods=["GET"])
+def events():
+    # Get the token from the request headers
+    token = request.headers.get("Authorization")
+    if not token:
+        return jsonify({"error": "Missing required fields: token"}), 400
+
+    # Retrieve account information using the token
+    token_info = get_account_by_token(token)
+    if not token_info:
+        return jsonify({"error": "Invalid token: need to re-login"}), 400
+    if token_info.get("success") is False:
+        # Store error
+        return jsonify(token_info), 200
+
+    symbols = request.args.get("symbols")
+    symbols = [symbol for symbol in symbols.split(",") if symbol] if symbols else []
+
+    poller, subscriber = subscribe(token_info, symbols)
+
+    def generate():
+        try:
+            while True:
+                try:
+                    event = subscriber.queue.get(timeout=KEEPALIVE_INTERVAL)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield format_event(event)
+        finally:
+            poller.unsubscribe(subscriber)
+
+    return Response(
+        generate(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
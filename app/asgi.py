@@ -0,0 +1,448 @@
+import asyncio
+import io
+import json
+import queue
+import sys
+import time
+from urllib.parse import parse_qsl
+
+from werkzeug.datastructures import Headers, MultiDict
+
+from mt5 import (
+    get_account_by_token_async,
+    get_account_info_snapshot,
+    get_cached_account_info,
+)
+from metrics import record_request
+from terminal_pool import terminal_pool
+from .api.accounts import (
+    authenticate,
+    handle_close_positions,
+    handle_get_account_info,
+    handle_get_positions,
+    handle_get_symbol_info,
+    handle_get_symbol_ticks,
+    handle_order_status,
+    handle_place_order,
+    handle_place_orders,
+)
+from .api.stream import KEEPALIVE_INTERVAL, format_event, subscribe
+
+
+# ASGI front-end, served by uvicorn when SERVER=asgi. The routes that wait on
+# terminals or on queued orders and the event stream run on the event loop:
+# they are the shared routes of app/api/accounts.py, their steps are awaited
+# here, terminal calls are queued on the worker's executor thread and idle
+# connections only hold a coroutine. Every other route is passed to the Flask
+# app on a thread.
+
+
+class AsgiRequest:
+    def __init__(self, scope, body):
+        self.method = scope["method"]
+        self.path = scope["path"]
+        self.headers = Headers(
+            [
+                (name.decode("latin1"), value.decode("latin1"))
+                for name, value in scope["headers"]
+            ]
+        )
+        self.args = MultiDict(
+            parse_qsl(scope["query_string"].decode("latin1"), keep_blank_values=True)
+        )
+        self.body = body
+        self.wait_time = 0
+        self.timings = {}
+        self.api_id = None
+        self.start_time = time.perf_counter()
+
+    def get_json(self, silent=False):
+        try:
+            return json.loads(self.body) if self.body else None
+        except ValueError:
+            if silent:
+                return None
+            raise
+
+    def add_timing(self, stage, seconds):
+        self.timings[stage] = self.timings.get(stage, 0) + seconds
+
+
+def terminal_call(request, worker, account, func_name, args, kwargs, submitted_at):
+    # Runs on the worker's executor thread
+    with worker.lock:
+        # Record the time spent queued and waiting for the terminal
+        request.wait_time += time.perf_counter() - submitted_at
+        start_time = time.perf_counter()
+        result = worker.call(account, func_name, *args, **kwargs)
+        request.add_timing("terminal", time.perf_counter() - start_time)
+        # Stages measured inside the terminal worker: initialize, login, ...
+        for stage, seconds in worker.last_timings.items():
+            request.add_timing(stage, seconds)
+        return result
+
+
+async def run_on_worker(request, worker, account, func_name, *args, **kwargs):
+    return await worker.submit(
+        terminal_call,
+        request,
+        worker,
+        account,
+        func_name,
+        args,
+        kwargs,
+        time.perf_counter(),
+    )
+
+
+async def run_on_terminal(request, account_id, account, func_name, *args, **kwargs):
+    worker = terminal_pool.worker_for(account_id)
+    if worker is None:
+        return {"success": False, "message": "No terminal available, try again later"}
+    return await run_on_worker(request, worker, account, func_name, *args, **kwargs)
+
+
+async def get_account_info(request, account):
+    account_id = account.get("account_id")
+    broker_name = account.get("broker_name")
+
+    # A fresh snapshot is answered on the loop, only misses queue a job
+    cached = get_cached_account_info(account_id, broker_name)
+    if cached is not None:
+        return cached
+
+    worker = terminal_pool.worker_for(account_id)
+    if worker is None:
+        return {"success": False, "message": "No terminal available, try again later"}
+
+    # Same lock order as the Flask route: snapshot lock, then worker.lock
+    submitted_at = time.perf_counter()
+    return await worker.submit(
+        get_account_info_snapshot,
+        account_id,
+        broker_name,
+        lambda: terminal_call(
+            request, worker, account, "get_mt5_account_info", (), {}, submitted_at
+        ),
+    )
+
+
+async def wait_for_job(job, timeout):
+    # The queue thread wakes the loop, no thread waits on job.done
+    loop = asyncio.get_running_loop()
+    done = loop.create_future()
+
+    def set_done():
+        if not done.done():
+            done.set_result(None)
+
+    job.on_done(lambda: loop.call_soon_threadsafe(set_done))
+    try:
+        await asyncio.wait_for(done, timeout)
+    except asyncio.TimeoutError:
+        pass
+
+
+async def run_step(request, step):
+    kind = step[0]
+    if kind == "auth":
+        start_time = time.perf_counter()
+        token_info = await get_account_by_token_async(step[1])
+        request.add_timing("auth", time.perf_counter() - start_time)
+        if token_info and "api_id" in token_info:
+            request.api_id = token_info["api_id"]
+        return token_info
+    if kind == "terminal":
+        _, account, func_name, args, kwargs = step
+        return await run_on_terminal(
+            request, account.get("account_id"), account, func_name, *args, **kwargs
+        )
+    if kind == "worker":
+        _, worker, func_name, args, kwargs = step
+        return await run_on_worker(request, worker, None, func_name, *args, **kwargs)
+    if kind == "account_info":
+        return await get_account_info(request, step[1])
+    if kind == "wait_for_job":
+        _, job, timeout = step
+        await wait_for_job(job, timeout)
+        return None
+    raise ValueError(f"Unknown route step: {kind}")
+
+
+async def run_route(request, route, *args):
+    # Runs a shared route, its steps are awaited on the loop
+    steps = route(request, *args)
+    result = None
+    while True:
+        try:
+            step = steps.send(result)
+        except StopIteration as stop:
+            return stop.value
+        result = await run_step(request, step)
+
+
+# (method, path) -> (Flask endpoint name used for metrics, handler)
+ROUTES = {
+    ("GET", "/api/v1/account/get_account_info"): (
+        "account_routes.get_account_info",
+        handle_get_account_info,
+    ),
+    ("GET", "/api/v1/account/get_positions"): (
+        "account_routes.get_positions",
+        handle_get_positions,
+    ),
+    ("GET", "/api/v1/account/get_symbol_info"): (
+        "account_routes.get_symbol_info",
+        handle_get_symbol_info,
+    ),
+    ("GET", "/api/v1/account/get_symbol_ticks"): (
+        "account_routes.get_symbol_ticks",
+        handle_get_symbol_ticks,
+    ),
+    ("POST", "/api/v1/account/place_order"): (
+        "account_routes.place_order",
+        handle_place_order,
+    ),
+    ("POST", "/api/v1/account/place_orders"): (
+        "account_routes.place_orders",
+        handle_place_orders,
+    ),
+    ("POST", "/api/v1/account/close_positions"): (
+        "account_routes.close_positions",
+        handle_close_positions,
+    ),
+}
+# (method, path prefix) -> (endpoint name, handler), the rest of the path is
+# passed to the handler
+PREFIX_ROUTES = {
+    ("GET", "/api/v1/account/order_status/"): (
+        "account_routes.order_status",
+        handle_order_status,
+    ),
+}
+EVENTS_PATH = "/api/v1/stream/events"
+
+
+def match_prefix_route(request):
+    for (method, prefix), route in PREFIX_ROUTES.items():
+        if request.method != method or not request.path.startswith(prefix):
+            continue
+        value = request.path[len(prefix):]
+        if value and "/" not in value:
+            return route, (value,)
+    return None, ()
+
+
+async def read_body(receive):
+    body = b""
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return body
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            return body
+
+
+async def wait_for_disconnect(receive):
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+class AsgiApp:
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        self.slow_request_seconds = flask_app.config.get("SLOW_REQUEST_SECONDS")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    await send({"type": "lifespan.startup.complete"})
+                elif message["type"] == "lifespan.shutdown":
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+        if scope["type"] != "http":
+            return
+
+        body = await read_body(receive)
+        request = AsgiRequest(scope, body)
+        if request.method == "GET" and request.path == EVENTS_PATH:
+            await self.stream_events(request, receive, send)
+            return
+        route, args = ROUTES.get((request.method, request.path)), ()
+        if route is None:
+            route, args = match_prefix_route(request)
+        if route is None:
+            await self.call_flask(scope, body, send)
+            return
+
+        endpoint, handler = route
+        try:
+            payload, status = await run_route(request, handler, *args)
+        except Exception as e:
+            print(f"ASGI error on {endpoint}: {e}")
+            payload, status = {"success": False, "message": f"Server error: {e}"}, 500
+
+        # Add the wait time before serializing, so the body is encoded only once
+        start_time = time.perf_counter()
+        content = self.dumps({**payload, "wait_time": request.wait_time})
+        request.add_timing("serialization", time.perf_counter() - start_time)
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(content)).encode()),
+                    (b"x-wait-time", str(request.wait_time).encode()),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": content})
+
+        record_request(
+            endpoint,
+            request.api_id if request.api_id is not None else "",
+            time.perf_counter() - request.start_time,
+            request.wait_time,
+            request.timings,
+            self.slow_request_seconds,
+        )
+
+    def dumps(self, payload):
+        # Same JSON provider as the Flask routes, orjson or Flask's default
+        return self.flask_app.json.dumps(payload).encode()
+
+    async def stream_events(self, request, receive, send):
+        token_info, error = await run_route(request, authenticate)
+        if error:
+            payload, status = error
+            content = self.dumps(payload)
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": status,
+                    "headers": [(b"content-type", b"application/json")],
+                }
+            )
+            await send({"type": "http.response.body", "body": content})
+            return
+
+        symbols = request.args.get("symbols")
+        symbols = [symbol for symbol in symbols.split(",") if symbol] if symbols else []
+        poller, subscriber = subscribe(
+            token_info, symbols, asyncio.get_running_loop()
+        )
+
+        disconnect = asyncio.ensure_future(wait_for_disconnect(receive))
+        try:
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": 200,
+                    "headers": [
+                        (b"content-type", b"text/event-stream; charset=utf-8"),
+                        (b"cache-control", b"no-cache"),
+                        (b"x-accel-buffering", b"no"),
+                    ],
+                }
+            )
+            while not disconnect.done():
+                try:
+                    event = subscriber.queue.get_nowait()
+                except queue.Empty:
+                    # Clear before the re-check, a publish in between sets it again
+                    subscriber.wakeup.clear()
+                    if not subscriber.queue.empty():
+                        continue
+                    wakeup = asyncio.ensure_future(subscriber.wakeup.wait())
+                    done, _ = await asyncio.wait(
+                        {wakeup, disconnect},
+                        timeout=KEEPALIVE_INTERVAL,
+                        return_when=asyncio.FIRST_COMPLETED,
+                    )
+                    wakeup.cancel()
+                    if not done:
+                        await send(
+                            {
+                                "type": "http.response.body",
+                                "body": b": keep-alive\n\n",
+                                "more_body": True,
+                            }
+                        )
+                    continue
+                await send(
+                    {
+                        "type": "http.response.body",
+                        "body": format_event(event).encode(),
+                        "more_body": True,
+                    }
+                )
+        except OSError:
+            # Client went away while we were writing
+            pass
+        finally:
+            disconnect.cancel()
+            poller.unsubscribe(subscriber)
+
+    async def call_flask(self, scope, body, send):
+        environ = {
+            "REQUEST_METHOD": scope["method"],
+            "SCRIPT_NAME": scope.get("root_path", "").encode().decode("latin1"),
+            "PATH_INFO": scope["path"].encode().decode("latin1"),
+            "QUERY_STRING": scope["query_string"].decode("latin1"),
+            "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": scope.get("scheme", "http"),
+            "wsgi.input": io.BytesIO(body),
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": False,
+            "wsgi.run_once": False,
+        }
+        server = scope.get("server") or ("localhost", 80)
+        environ["SERVER_NAME"] = server[0]
+        environ["SERVER_PORT"] = str(server[1])
+        if scope.get("client"):
+            environ["REMOTE_ADDR"] = scope["client"][0]
+        for name, value in scope["headers"]:
+            name = name.decode("latin1").upper().replace("-", "_")
+            value = value.decode("latin1")
+            if name == "CONTENT_TYPE" or name == "CONTENT_LENGTH":
+                environ[name] = value
+                continue
+            name = f"HTTP_{name}"
+            environ[name] = f"{environ[name]},{value}" if name in environ else value
+
+        # The Flask routes are blocking, run them on the default thread pool
+        status, headers, content = await asyncio.get_running_loop().run_in_executor(
+            None, self.run_flask, environ
+        )
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status,
+                "headers": headers,
+            }
+        )
+        await send({"type": "http.response.body", "body": content})
+
+    def run_flask(self, environ):
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            response["status"] = int(status.split(" ", 1)[0])
+            response["headers"] = [
+                (name.lower().encode("latin1"), value.encode("latin1"))
+                for name, value in headers
+            ]
+
+        chunks = self.flask_app(environ, start_response)
+        try:
+            content = b"".join(chunks)
+        finally:
+            if hasattr(chunks, "close"):
+                chunks.close()
+        return response["status"], response["headers"], content
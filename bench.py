@@ -0,0 +1,155 @@
+import argparse
+import os
+import random
+import threading
+import time
+
+# Load test against the fake MetaTrader5 backend: N concurrent clients send
+# requests through the Flask app and the terminal pool, the report shows
+# throughput and p50/p99 latency per route. Same arguments, same request mix.
+#
+#   python bench.py --clients 16 --requests 200 --pool-size 4
+
+ROUTES = {
+    "get_positions": ("GET", "/api/v1/account/get_positions", None),
+    "get_account_info": ("GET", "/api/v1/account/get_account_info", None),
+    "get_symbol_info": ("GET", "/api/v1/account/get_symbol_info?symbol=EURUSD", None),
+    "get_symbol_ticks": (
+        "GET",
+        "/api/v1/account/get_symbol_ticks?symbols=EURUSD,GBPUSD,USDJPY",
+        None,
+    ),
+    "place_order": (
+        "POST",
+        "/api/v1/account/place_order",
+        {
+            "action": "TRADE_ACTION_DEAL",
+            "symbol": "EURUSD",
+            "volume": 0.01,
+            "order_type": "ORDER_TYPE_BUY",
+            "type_filling": "ORDER_FILLING_IOC",
+            "type_time": "ORDER_TIME_GTC",
+            "magic": 1000,
+            "deviation": 10,
+        },
+    ),
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Load test with the fake MT5 backend")
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=100, help="per client")
+    parser.add_argument("--accounts", type=int, default=4)
+    parser.add_argument("--pool-size", type=int, default=2)
+    parser.add_argument("--routes", default=",".join(ROUTES))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.001)
+    parser.add_argument("--login-latency", type=float, default=0.05)
+    parser.add_argument("--order-latency", type=float, default=0.02)
+    parser.add_argument("--failure-rate", type=float, default=0)
+    parser.add_argument("--positions", type=int, default=100)
+    return parser.parse_args()
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def run_client(app, client_id, args, routes, tokens, results, results_lock):
+    # Every client has its own seeded request mix
+    rng = random.Random(args.seed * 1000 + client_id)
+    client = app.test_client()
+    samples = []
+    for _ in range(args.requests):
+        route = rng.choice(routes)
+        method, path, body = ROUTES[route]
+        headers = {"Authorization": rng.choice(tokens)}
+        start_time = time.perf_counter()
+        if method == "POST":
+            response = client.post(path, json=body, headers=headers)
+        else:
+            response = client.get(path, headers=headers)
+        elapsed = time.perf_counter() - start_time
+        payload = response.get_json(silent=True) or {}
+        ok = response.status_code == 200 and payload.get("success") is not False
+        samples.append((route, elapsed, ok))
+    with results_lock:
+        results.extend(samples)
+
+
+def main():
+    args = parse_args()
+    routes = [route for route in args.routes.split(",") if route]
+    for route in routes:
+        if route not in ROUTES:
+            raise SystemExit(f"Unknown route: {route}")
+
+    # Read by fake_mt5 in this process and in every terminal worker
+    os.environ["MT5_BACKEND"] = "fake"
+    os.environ["FAKE_MT5_SEED"] = str(args.seed)
+    os.environ["FAKE_MT5_LATENCY"] = str(args.latency)
+    os.environ["FAKE_MT5_LOGIN_LATENCY"] = str(args.login_latency)
+    os.environ["FAKE_MT5_ORDER_LATENCY"] = str(args.order_latency)
+    os.environ["FAKE_MT5_FAILURE_RATE"] = str(args.failure_rate)
+    os.environ["FAKE_MT5_POSITIONS"] = str(args.positions)
+
+    from account_store import account_store
+    from app import create_app
+    from terminal_images import terminal_images
+    from terminal_pool import terminal_pool
+
+    # Benchmark accounts live in the in-memory account store
+    account_store.open("memory")
+    tokens = []
+    for index in range(args.accounts):
+        token = f"bench-token-{index}"
+        account_store.save(
+            f"bench-{index}", token, 100000 + index, "bench", "FakeBroker-Demo"
+        ).result()
+        tokens.append(token)
+
+    app = create_app("production")
+    terminal_images.start(int(time.time()), 0, "link")
+    terminal_pool.start(args.pool_size, wait=True)
+
+    results = []
+    results_lock = threading.Lock()
+    try:
+        threads = [
+            threading.Thread(
+                target=run_client,
+                args=(app, client_id, args, routes, tokens, results, results_lock),
+            )
+            for client_id in range(args.clients)
+        ]
+        start_time = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start_time
+    finally:
+        terminal_pool.stop()
+
+    print(
+        f"{args.clients} clients, {len(results)} requests in {elapsed:.2f}s, "
+        f"{len(results) / elapsed:.1f} req/s"
+    )
+    print(f"{'route':<20}{'count':>8}{'errors':>8}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for route in routes:
+        samples = [sample for sample in results if sample[0] == route]
+        if not samples:
+            continue
+        latencies = [sample[1] for sample in samples]
+        errors = sum(1 for sample in samples if not sample[2])
+        print(
+            f"{route:<20}{len(samples):>8}{errors:>8}{len(samples) / elapsed:>10.1f}"
+            f"{percentile(latencies, 0.5) * 1000:>10.2f}"
+            f"{percentile(latencies, 0.99) * 1000:>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
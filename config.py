@@ -27,6 +27,38 @@ class Config:
     VIDEO_MAX_SIZE_BYTES = VIDEO_MAX_SIZE_MB * 1024 * 1024
 
     PORT = config.get("PORT") or 5000
+    # "flask" runs the Flask server, "asgi" serves create_asgi_app with uvicorn
+    SERVER = config.get("SERVER") or "flask"
+
+    # Number of terminal worker processes, each one owns a portable terminal
+    TERMINAL_POOL_SIZE = int(config.get("TERMINAL_POOL_SIZE") or 1)
+    # Started terminal copies kept ready for new workers
+    TERMINAL_SPARE_IMAGES = int(config.get("TERMINAL_SPARE_IMAGES") or 1)
+    # "copy" copies the whole terminal tree per account, "link" hardlinks the
+    # read-only files and only copies the per-account state
+    TERMINAL_PROVISION_MODE = config.get("TERMINAL_PROVISION_MODE") or "copy"
+    # Reuse the accounts/<id> directories and running terminals of the last
+    # run instead of deleting and provisioning them again
+    WARM_RESTART = (config.get("WARM_RESTART") or "false").lower() == "true"
+    # Seconds between two health probes of every terminal
+    TERMINAL_PROBE_INTERVAL = int(config.get("TERMINAL_PROBE_INTERVAL") or 10)
+
+    # Log requests slower than this many seconds with their stage timings, 0 disables
+    SLOW_REQUEST_SECONDS = float(config.get("SLOW_REQUEST_SECONDS") or 0)
+
+    # Account and token storage: "mongo", "sqlite" (login_data.db) or "memory"
+    ACCOUNT_STORE = config.get("ACCOUNT_STORE") or "mongo"
+    MONGO_URI = config.get("MONGO_URI") or "mongodb://localhost:27017/"
+    MONGO_DB = config.get("MONGO_DB") or "mt5_database"
+    MONGO_MIN_POOL_SIZE = int(config.get("MONGO_MIN_POOL_SIZE") or 0)
+    MONGO_MAX_POOL_SIZE = int(config.get("MONGO_MAX_POOL_SIZE") or 100)
+    SQLITE_PATH = config.get("SQLITE_PATH") or os.path.join(BASE_DIR, "login_data.db")
+    SQLITE_POOL_SIZE = int(config.get("SQLITE_POOL_SIZE") or 4)
+    # Switch the SQLite file to WAL mode, readers no longer wait for writes
+    SQLITE_WAL = (config.get("SQLITE_WAL") or "false").lower() == "true"
+
+    # "orjson" uses orjson for API responses when installed, "json" the default
+    JSON_BACKEND = config.get("JSON_BACKEND") or "orjson"
 
 
 class DevelopmentConfig(Config):
@@ -0,0 +1,277 @@
+import os
+import random
+import threading
+import time
+from collections import namedtuple
+
+# In-process stand-in for the MetaTrader5 package, selected with
+# MT5_BACKEND=fake. Latencies (seconds) and the failure rate are read from the
+# environment so terminal worker processes pick them up, or set with configure.
+
+settings = {
+    "latency": float(os.environ.get("FAKE_MT5_LATENCY") or 0.001),
+    "login_latency": float(os.environ.get("FAKE_MT5_LOGIN_LATENCY") or 0.05),
+    "order_latency": float(os.environ.get("FAKE_MT5_ORDER_LATENCY") or 0.02),
+    "failure_rate": float(os.environ.get("FAKE_MT5_FAILURE_RATE") or 0),
+    "positions": int(os.environ.get("FAKE_MT5_POSITIONS") or 100),
+    "seed": int(os.environ.get("FAKE_MT5_SEED") or 0),
+}
+
+# Constants, same values as the MetaTrader5 package
+TRADE_ACTION_DEAL = 1
+TRADE_ACTION_PENDING = 5
+TRADE_ACTION_SLTP = 6
+TRADE_ACTION_MODIFY = 7
+TRADE_ACTION_REMOVE = 8
+TRADE_ACTION_CLOSE_BY = 10
+
+ORDER_TYPE_BUY = 0
+ORDER_TYPE_SELL = 1
+ORDER_TYPE_BUY_LIMIT = 2
+ORDER_TYPE_SELL_LIMIT = 3
+ORDER_TYPE_BUY_STOP = 4
+ORDER_TYPE_SELL_STOP = 5
+ORDER_TYPE_BUY_STOP_LIMIT = 6
+ORDER_TYPE_SELL_STOP_LIMIT = 7
+ORDER_TYPE_CLOSE_BY = 8
+
+ORDER_FILLING_FOK = 0
+ORDER_FILLING_IOC = 1
+ORDER_FILLING_RETURN = 2
+ORDER_FILLING_BOC = 3
+
+ORDER_TIME_GTC = 0
+ORDER_TIME_DAY = 1
+ORDER_TIME_SPECIFIED = 2
+ORDER_TIME_SPECIFIED_DAY = 3
+
+SYMBOL_TRADE_MODE_DISABLED = 0
+SYMBOL_TRADE_MODE_LONGONLY = 1
+SYMBOL_TRADE_MODE_SHORTONLY = 2
+SYMBOL_TRADE_MODE_CLOSEONLY = 3
+SYMBOL_TRADE_MODE_FULL = 4
+
+SYMBOL_TRADE_EXECUTION_REQUEST = 0
+SYMBOL_TRADE_EXECUTION_INSTANT = 1
+SYMBOL_TRADE_EXECUTION_MARKET = 2
+SYMBOL_TRADE_EXECUTION_EXCHANGE = 3
+
+SYMBOL_FILLING_FOK = 1
+SYMBOL_FILLING_IOC = 2
+
+TRADE_RETCODE_REJECT = 10006
+TRADE_RETCODE_DONE = 10009
+TRADE_RETCODE_INVALID_VOLUME = 10014
+
+RES_S_OK = 1
+RES_E_FAIL = -1
+RES_E_INTERNAL_FAIL = -10000
+
+TerminalInfo = namedtuple(
+    "TerminalInfo", ["connected", "trade_allowed", "ping_last", "path"]
+)
+AccountInfo = namedtuple(
+    "AccountInfo",
+    ["login", "server", "currency", "leverage", "balance", "equity", "margin",
+     "margin_free", "profit"],
+)
+SymbolInfo = namedtuple(
+    "SymbolInfo",
+    ["name", "select", "digits", "point", "bid", "ask", "last", "volume_min",
+     "volume_max", "volume_step", "trade_contract_size", "trade_stops_level",
+     "trade_mode", "trade_exemode", "filling_mode"],
+)
+Tick = namedtuple(
+    "Tick", ["time", "bid", "ask", "last", "volume", "time_msc", "flags", "volume_real"]
+)
+TradePosition = namedtuple(
+    "TradePosition",
+    ["ticket", "time", "time_msc", "time_update", "time_update_msc", "type",
+     "magic", "identifier", "reason", "volume", "price_open", "sl", "tp",
+     "price_current", "swap", "profit", "symbol", "comment", "external_id"],
+)
+OrderSendResult = namedtuple(
+    "OrderSendResult",
+    ["retcode", "deal", "order", "volume", "price", "bid", "ask", "comment",
+     "request_id", "retcode_external", "request"],
+)
+OrderCheckResult = namedtuple(
+    "OrderCheckResult",
+    ["retcode", "balance", "equity", "profit", "margin", "margin_free",
+     "margin_level", "comment", "request"],
+)
+
+SYMBOLS = ["EURUSD", "GBPUSD", "USDJPY", "USDCHF", "AUDUSD", "USDCAD", "XAUUSD"]
+
+state = {
+    "initialized": False,
+    "login": None,
+    "server": None,
+    "last_error": (RES_S_OK, "Success"),
+    "selected": set(SYMBOLS[:3]),
+    "positions": {},
+    "next_ticket": 1,
+}
+lock = threading.Lock()
+rng = random.Random(settings["seed"])
+
+
+def configure(**kwargs):
+    settings.update(kwargs)
+    rng.seed(settings["seed"])
+
+
+def _call(latency=None):
+    # Simulated IPC round-trip, returns False when the call should fail
+    time.sleep(settings["latency"] if latency is None else latency)
+    if settings["failure_rate"] and rng.random() < settings["failure_rate"]:
+        state["last_error"] = (RES_E_FAIL, "Fake failure")
+        return False
+    state["last_error"] = (RES_S_OK, "Success")
+    return True
+
+
+def _price(symbol):
+    base = 150.0 if symbol.endswith("JPY") else 2000.0 if symbol == "XAUUSD" else 1.1
+    return round(base * (1 + rng.uniform(-0.001, 0.001)), 5)
+
+
+def _seed_positions():
+    now = int(time.time())
+    for _ in range(settings["positions"]):
+        symbol = rng.choice(SYMBOLS)
+        price = _price(symbol)
+        ticket = state["next_ticket"]
+        state["next_ticket"] += 1
+        state["positions"][ticket] = TradePosition(
+            ticket, now, now * 1000, now, now * 1000, rng.choice([0, 1]),
+            rng.choice([0, 1000, 2000]), ticket, 0, 0.01, price, 0.0, 0.0,
+            price, 0.0, round(rng.uniform(-50, 50), 2), symbol, "", "",
+        )
+
+
+def initialize(path=None, portable=False, timeout=None, **kwargs):
+    if not _call():
+        return False
+    state["initialized"] = True
+    return True
+
+
+def shutdown():
+    state["initialized"] = False
+    state["login"] = None
+    return True
+
+
+def last_error():
+    return state["last_error"]
+
+
+def terminal_info():
+    if not state["initialized"] or not _call():
+        return None
+    return TerminalInfo(state["login"] is not None, True, 1000, "fake")
+
+
+def login(login, password=None, server=None, timeout=None):
+    if not state["initialized"] or not _call(settings["login_latency"]):
+        return False
+    with lock:
+        if state["login"] != login:
+            state["positions"] = {}
+            _seed_positions()
+        state["login"] = login
+        state["server"] = server
+    return True
+
+
+def account_info():
+    if state["login"] is None or not _call():
+        return None
+    profit = sum(position.profit for position in state["positions"].values())
+    return AccountInfo(
+        state["login"], state["server"], "USD", 100, 10000.0, 10000.0 + profit,
+        0.0, 10000.0 + profit, profit,
+    )
+
+
+def symbols_get(group=None):
+    if not _call():
+        return None
+    return tuple(symbol_info(symbol, _latency=0) for symbol in SYMBOLS)
+
+
+def symbol_info(symbol, _latency=None):
+    if symbol not in SYMBOLS or not _call(_latency):
+        return None
+    price = _price(symbol)
+    digits = 3 if symbol.endswith("JPY") else 2 if symbol == "XAUUSD" else 5
+    return SymbolInfo(
+        symbol, symbol in state["selected"], digits, 10**-digits, price,
+        price + 10**-digits * 10, price, 0.01, 100.0, 0.01, 100000.0, 0,
+        SYMBOL_TRADE_MODE_FULL, SYMBOL_TRADE_EXECUTION_MARKET,
+        SYMBOL_FILLING_FOK | SYMBOL_FILLING_IOC,
+    )
+
+
+def symbol_info_tick(symbol):
+    if symbol not in state["selected"] or not _call():
+        return None
+    price = _price(symbol)
+    now = time.time()
+    return Tick(int(now), price, price + 0.0001, price, 0, int(now * 1000), 0, 0.0)
+
+
+def symbol_select(symbol, enable=True):
+    if symbol not in SYMBOLS or not _call():
+        return False
+    if enable:
+        state["selected"].add(symbol)
+    else:
+        state["selected"].discard(symbol)
+    return True
+
+
+def positions_get(symbol=None, group=None, ticket=None):
+    if state["login"] is None or not _call():
+        return None
+    positions = list(state["positions"].values())
+    if ticket is not None:
+        positions = [position for position in positions if position.ticket == ticket]
+    if symbol is not None:
+        positions = [position for position in positions if position.symbol == symbol]
+    if group is not None:
+        pattern = group.replace("*", "")
+        positions = [position for position in positions if pattern in position.symbol]
+    return tuple(positions)
+
+
+def order_check(request):
+    if not _call():
+        return None
+    return OrderCheckResult(0, 10000.0, 10000.0, 0.0, 0.0, 10000.0, 0.0, "Done", request)
+
+
+def order_send(request):
+    if state["login"] is None or not _call(settings["order_latency"]):
+        return None
+    symbol = request.get("symbol")
+    price = request.get("price") or _price(symbol or SYMBOLS[0])
+    with lock:
+        ticket = state["next_ticket"]
+        state["next_ticket"] += 1
+        if request.get("action") == TRADE_ACTION_DEAL:
+            if request.get("position") is not None:
+                state["positions"].pop(request["position"], None)
+            else:
+                now = int(time.time())
+                state["positions"][ticket] = TradePosition(
+                    ticket, now, now * 1000, now, now * 1000, request.get("type", 0),
+                    request.get("magic", 0), ticket, 0, request.get("volume", 0.01),
+                    price, request.get("sl", 0.0), request.get("tp", 0.0), price,
+                    0.0, 0.0, symbol, request.get("comment", ""), "",
+                )
+    return OrderSendResult(
+        TRADE_RETCODE_DONE, ticket, ticket, request.get("volume", 0.0), price,
+        price, price, "Request executed", 0, 0, request,
+    )
@@ -0,0 +1,86 @@
+import threading
+
+
+# Upper bounds, in seconds, of the latency histogram buckets
+BUCKETS = [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+
+
+class Histogram:
+    # Minimal Prometheus histogram, rendered in the text exposition format
+
+    def __init__(self, name, help_text, label_names, buckets=BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        with self.lock:
+            series = self.series.get(key)
+            if series is None:
+                series = {"buckets": [0] * len(self.buckets), "sum": 0, "count": 0}
+                self.series[key] = series
+            for index, bucket in enumerate(self.buckets):
+                if value <= bucket:
+                    series["buckets"][index] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def render(self):
+        lines = [
+            f"# HELP {self.name} {self.help_text}",
+            f"# TYPE {self.name} histogram",
+        ]
+        with self.lock:
+            for key, series in self.series.items():
+                labels = ",".join(
+                    f'{name}="{value}"' for name, value in zip(self.label_names, key)
+                )
+                for bucket, count in zip(self.buckets, series["buckets"]):
+                    lines.append(
+                        f'{self.name}_bucket{{{labels},le="{bucket}"}} {count}'
+                    )
+                lines.append(
+                    f'{self.name}_bucket{{{labels},le="+Inf"}} {series["count"]}'
+                )
+                lines.append(f'{self.name}_sum{{{labels}}} {series["sum"]}')
+                lines.append(f'{self.name}_count{{{labels}}} {series["count"]}')
+        return lines
+
+
+request_seconds = Histogram(
+    "mt5_api_request_seconds",
+    "Time spent handling an API request.",
+    ["route", "api_id"],
+)
+stage_seconds = Histogram(
+    "mt5_api_stage_seconds",
+    "Time spent per stage of an API request.",
+    ["route", "api_id", "stage"],
+)
+
+
+def record_request(route, api_id, duration, wait_time, timings, slow_request_seconds=0):
+    # Series are labelled with the client's api_id, /metrics is not protected
+    # and must not list MT5 logins
+    request_seconds.observe(duration, route=route, api_id=api_id)
+    stage_seconds.observe(wait_time, route=route, api_id=api_id, stage="lock_wait")
+    for stage, seconds in timings.items():
+        stage_seconds.observe(seconds, route=route, api_id=api_id, stage=stage)
+
+    if slow_request_seconds and duration >= slow_request_seconds:
+        stages = ", ".join(
+            f"{stage}={seconds:.4f}"
+            for stage, seconds in [("lock_wait", wait_time), *timings.items()]
+        )
+        print(f"Slow request {route} api_id={api_id} {duration:.4f}s: {stages}")
+
+
+def render_metrics():
+    lines = []
+    for histogram in [request_seconds, stage_seconds]:
+        lines.extend(histogram.render())
+    return "\n".join(lines) + "\n"
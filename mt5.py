@@ -1,23 +1,95 @@
+import asyncio
 import os
 import shutil
 import time
-import signal
 import psutil
 import uuid
 import subprocess
-import MetaTrader5 as mt5
-from pymongo import MongoClient
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+import numpy as np
+from account_store import STORE_TIMEOUT, account_store
 
+# "fake" swaps the MetaTrader5 package for the in-process fake_mt5 module, for
+# load tests and development without terminals
+MT5_BACKEND = os.environ.get("MT5_BACKEND") or "metatrader5"
+if MT5_BACKEND == "fake":
+    import fake_mt5 as mt5
+else:
+    import MetaTrader5 as mt5
 
-base_path = os.getcwd()
 
-# MongoDB setup
-client = MongoClient("mongodb://localhost:27017/")
-db = client["mt5_database"]
-accounts_collection = db["accounts"]
-account_id = int(time.time())
+base_path = os.getcwd()
 
-print("=======", account_id)
+# Login the terminal of this process is currently on, used to skip mt5.login
+current_login = None
+login_stats = {"hits": 0, "misses": 0}
+
+# Bounded token -> credentials cache in front of account_store
+TOKEN_CACHE_SIZE = 1024
+TOKEN_CACHE_TTL = 60
+token_cache = OrderedDict()
+token_cache_lock = threading.Lock()
+
+# Terminal this process is attached to, set by setup_account
+terminal_path = None
+CONNECT_RETRIES = 5
+CONNECT_BACKOFF = 0.5
+# Milliseconds initialize() waits for a starting terminal
+TERMINAL_START_TIMEOUT = 60000
+
+# Symbols already selected in MarketWatch, per broker server of this terminal
+selected_symbols = {}
+SYMBOL_READY_TIMEOUT = 1
+SYMBOL_READY_POLL = 0.01
+
+# Static symbol metadata per broker server, refreshed after SYMBOL_SPECS_TTL
+symbol_specs = {}
+SYMBOL_SPECS_TTL = 3600
+# Run order_check for orders whose stops are close to the stops level
+ORDER_CHECK_BORDERLINE = True
+
+# Short lived account info snapshots, shared by bursts of polls
+ACCOUNT_INFO_TTL = 0.3
+account_info_snapshots = {}
+account_info_locks = {}
+account_info_lock = threading.Lock()
+
+# Parts of the terminal tree written per account, never shared by hardlink
+MUTABLE_PATHS = [
+    "Config",
+    "Bases",
+    "Profiles",
+    "logs",
+    "Tester",
+    os.path.join("MQL5", "Files"),
+    os.path.join("MQL5", "Logs"),
+    os.path.join("MQL5", "experts.dat"),
+]
+
+# account_id -> Popen of the terminals started by this process
+terminal_processes = {}
+# Seconds a terminal gets to exit before it is killed
+TERMINAL_STOP_TIMEOUT = 10
+
+# Seconds spent per stage of the current terminal call, sent back by the
+# terminal worker with every result
+stage_timings = {}
+# Set by the terminal worker once login_terminal has checked the connection,
+# the helpers it runs next skip their own check
+connection_checked = False
+
+
+@contextmanager
+def timed(stage):
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        stage_timings[stage] = (
+            stage_timings.get(stage, 0) + time.perf_counter() - start_time
+        )
 
 
 def copy_contents_if_not_exists(source_dir, destination_dir):
@@ -50,19 +122,137 @@ def copy_contents_if_not_exists(source_dir, destination_dir):
             print(f"{destination_item} already exists. Skipping.")
 
 
-def terminate_all_metatrader5():
-    for proc in psutil.process_iter(["pid", "name", "exe"]):
+def link_file(source_item, destination_item):
+    # Hardlinks share the data of the template, copy across volumes
+    try:
+        os.link(source_item, destination_item)
+    except OSError:
+        shutil.copy2(source_item, destination_item)
+
+
+def link_contents_if_not_exists(source_dir, destination_dir):
+    # Check if the source directory exists
+    if not os.path.exists(source_dir):
+        print(f"Source directory {source_dir} does not exist.")
+        return
+
+    # Check if the destination directory exists
+    if not os.path.exists(destination_dir):
+        os.makedirs(destination_dir)
+        print(f"Created destination directory {destination_dir}")
+    else:
+        return
+
+    # Directories are real, read-only files are hardlinked and the state the
+    # terminal writes per account is copied
+    for root, dirs, files in os.walk(source_dir):
+        relative_root = os.path.relpath(root, source_dir)
+        for name in dirs:
+            os.makedirs(
+                os.path.join(destination_dir, relative_root, name), exist_ok=True
+            )
+        for name in files:
+            relative_item = os.path.normpath(os.path.join(relative_root, name))
+            source_item = os.path.join(root, name)
+            destination_item = os.path.join(destination_dir, relative_item)
+            if any(
+                relative_item == path or relative_item.startswith(path + os.sep)
+                for path in MUTABLE_PATHS
+            ):
+                shutil.copy2(source_item, destination_item)
+            else:
+                link_file(source_item, destination_item)
+
+
+def terminal_exe_path(account_id):
+    return os.path.join(base_path, "accounts", str(account_id), "terminal64.exe")
+
+
+def terminal_pid_path(account_id):
+    return os.path.join(base_path, "accounts", str(account_id), "terminal.pid")
+
+
+def register_terminal_process(account_id, process):
+    terminal_processes[account_id] = process
+    # The pid file lets other processes and restarts find the terminal too
+    with open(terminal_pid_path(account_id), "w") as pid_file:
+        pid_file.write(str(process.pid))
+
+
+def get_terminal_process(account_id):
+    process = terminal_processes.get(account_id)
+    try:
+        if process is not None:
+            pid = process.pid
+        else:
+            with open(terminal_pid_path(account_id)) as pid_file:
+                pid = int(pid_file.read())
+        terminal = psutil.Process(pid)
+        # Make sure the pid was not reused by another program
+        if os.path.normcase(terminal.exe()) != os.path.normcase(
+            terminal_exe_path(account_id)
+        ):
+            return None
+        if terminal.status() == psutil.STATUS_ZOMBIE:
+            return None
+        return terminal
+    except (
+        OSError,
+        ValueError,
+        psutil.NoSuchProcess,
+        psutil.AccessDenied,
+        psutil.ZombieProcess,
+    ):
+        return None
+
+
+def is_terminal_running(account_id):
+    return get_terminal_process(account_id) is not None
+
+
+def stop_terminal_process(account_id):
+    terminal = get_terminal_process(account_id)
+    terminal_processes.pop(account_id, None)
+    if terminal is None:
+        return
+
+    # Ask the terminal to exit, kill it if it does not within the timeout
+    try:
+        if os.name == "nt":
+            # psutil's terminate() is TerminateProcess on Windows, a hard kill.
+            # taskkill without /F sends WM_CLOSE, the terminal shuts down cleanly.
+            subprocess.run(
+                ["taskkill", "/PID", str(terminal.pid)],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+        else:
+            terminal.terminate()
         try:
-            if proc.info["name"] == "terminal64.exe":
-                os.kill(proc.info["pid"], signal.SIGTERM)
-                print(f"MetaTrader 5 process {proc.info['pid']} terminated")
-        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-            pass
+            terminal.wait(timeout=TERMINAL_STOP_TIMEOUT)
+        except psutil.TimeoutExpired:
+            terminal.kill()
+            terminal.wait(timeout=TERMINAL_STOP_TIMEOUT)
+        print(f"MetaTrader 5 process {terminal.pid} terminated")
+    except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.TimeoutExpired):
+        pass
+
+
+def list_account_ids():
+    # Ids of the terminal directories in accounts/
+    accounts_path = os.path.join(base_path, "accounts")
+    if not os.path.isdir(accounts_path):
+        return []
+    return sorted(int(name) for name in os.listdir(accounts_path) if name.isdigit())
+
+
+def terminate_all_metatrader5():
+    # Every terminal lives in accounts/<id>, only those are looked up
+    for account_id in set(terminal_processes) | set(list_account_ids()):
+        stop_terminal_process(account_id)
 
 
 def shutdown_metatrader5_by_id(account_id):
-    account_path = os.path.join(base_path, "accounts", str(account_id))
-    account_path = os.path.join(account_path, "terminal64.exe")
     if not mt5.shutdown():
         error_code, error_message = mt5.last_error()
         print(
@@ -71,16 +261,7 @@ def shutdown_metatrader5_by_id(account_id):
     # else:
     #     print("MetaTrader 5 has been shut down successfully")
 
-    for proc in psutil.process_iter(["pid", "name", "exe"]):
-        try:
-            if (
-                proc.info["name"] == "terminal64.exe"
-                and proc.info["exe"] == account_path
-            ):
-                os.kill(proc.info["pid"], signal.SIGTERM)
-                print(f"MetaTrader 5 process at {account_path} terminated")
-        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-            pass
+    stop_terminal_process(account_id)
 
 
 def remove_account(account_id):
@@ -107,51 +288,231 @@ def re_setup_account(account_id):
     setup_account(account_id)
 
 
-def setup_account():
-    remove_account(account_id)
+def provision_terminal(account_id, mode="copy"):
+    # Copy the terminal into accounts/<id> and start it in portable mode, an
+    # existing directory is kept as it is
     account_path = os.path.join(base_path, "accounts", str(account_id))
     meta_trader = os.path.join(base_path, "meta-trader")
-    copy_contents_if_not_exists(meta_trader, account_path)
+    if mode == "link":
+        link_contents_if_not_exists(meta_trader, account_path)
+    else:
+        copy_contents_if_not_exists(meta_trader, account_path)
     account_path = os.path.join(account_path, "terminal64.exe")
-    subprocess.Popen([account_path, "/portable"])
-    time.sleep(2)
-    if not mt5.initialize(path=account_path, portable=True):
-        error_code, error_message = mt5.last_error()
-        print(
-            f"initialize() failed, error code = {error_code}, message = {error_message}"
+    # The fake backend has no terminal to start, a terminal left running by a
+    # previous start is reused
+    if MT5_BACKEND != "fake" and not is_terminal_running(account_id):
+        register_terminal_process(
+            account_id, subprocess.Popen([account_path, "/portable"])
         )
-        mt5.shutdown()
-        quit()
+    return account_path
 
 
-def mt5_login_account(api_id, account_id, password, broker_name):
-    # Initialize MetaTrader 5
-    if not mt5.initialize():
+def attach_terminal(account_id):
+    global terminal_path
+
+    account_path = os.path.join(base_path, "accounts", str(account_id))
+    account_path = os.path.join(account_path, "terminal64.exe")
+    terminal_path = account_path
+    # initialize() waits until the terminal is up, no fixed sleep needed
+    if not mt5.initialize(
+        path=account_path, portable=True, timeout=TERMINAL_START_TIMEOUT
+    ):
         error_code, error_message = mt5.last_error()
+        mt5.shutdown()
         return {
             "success": False,
             "message": f"initialize() failed, error code = {error_code}, message = {error_message}",
         }
+    return None
 
-    login_result = mt5.login(login=account_id, password=password, server=broker_name)
 
-    if login_result:
-        random_unique_id = str(uuid.uuid4())
+def setup_account(account_id):
+    remove_account(account_id)
+    provision_terminal(account_id)
+    return attach_terminal(account_id)
 
-        # Insert or replace the record
-        accounts_collection.update_one(
-            {"id": api_id},
-            {
-                "$set": {
-                    "token": random_unique_id,
-                    "account_id": account_id,
-                    "password": password,
-                    "broker_name": broker_name,
-                }
-            },
-            upsert=True,
+
+def ensure_connection():
+    # Already checked by the terminal worker for the current message
+    if connection_checked:
+        return None
+    with timed("initialize"):
+        return connect_terminal()
+
+
+def connect_terminal():
+    global current_login
+
+    # terminal_info() is a cheap IPC call, only reconnect if the link is gone
+    if mt5.terminal_info() is not None:
+        return None
+
+    current_login = None
+    selected_symbols.clear()
+    delay = CONNECT_BACKOFF
+    for attempt in range(CONNECT_RETRIES):
+        if terminal_path:
+            connected = mt5.initialize(path=terminal_path, portable=True)
+        else:
+            connected = mt5.initialize()
+        if connected:
+            print(f"Reconnected to the terminal after {attempt + 1} attempt(s)")
+            return None
+        if attempt < CONNECT_RETRIES - 1:
+            time.sleep(delay)
+            delay *= 2
+
+    error_code, error_message = mt5.last_error()
+    return {
+        "success": False,
+        "message": f"initialize() failed, error code = {error_code}, message = {error_message}",
+    }
+
+
+def symbol_info_to_spec(info):
+    return {
+        "name": info.name,
+        "digits": info.digits,
+        "point": info.point,
+        "volume_min": info.volume_min,
+        "volume_max": info.volume_max,
+        "volume_step": info.volume_step,
+        "trade_contract_size": info.trade_contract_size,
+        "trade_stops_level": info.trade_stops_level,
+        "trade_mode": info.trade_mode,
+        "trade_exemode": info.trade_exemode,
+        "filling_mode": info.filling_mode,
+    }
+
+
+def get_symbol_specs(refresh=False):
+    server = current_login[1] if current_login else None
+    cached = symbol_specs.get(server)
+    if not refresh and cached is not None and cached[0] > time.monotonic():
+        return cached[1]
+
+    symbols = mt5.symbols_get()
+    if symbols is None or len(symbols) == 0:
+        return {}
+
+    specs = {info.name: symbol_info_to_spec(info) for info in symbols}
+    symbol_specs[server] = (time.monotonic() + SYMBOL_SPECS_TTL, specs)
+    return specs
+
+
+def ensure_symbol_selected(symbol):
+    server = current_login[1] if current_login else None
+    registry = selected_symbols.get(server)
+    if registry is None:
+        # Warm the registry with what MarketWatch already shows
+        symbols = mt5.symbols_get() or ()
+        registry = {info.name for info in symbols if info.select}
+        selected_symbols[server] = registry
+
+    if symbol in registry:
+        return None
+
+    with timed("symbol_select"):
+        if not mt5.symbol_select(symbol, True):
+            error_code, error_message = mt5.last_error()
+            return {
+                "success": False,
+                "message": f"Failed to select {symbol}, error code = {error_code}, message = {error_message}",
+            }
+
+        # Cold symbol: wait for its first quote, bounded by SYMBOL_READY_TIMEOUT
+        deadline = time.monotonic() + SYMBOL_READY_TIMEOUT
+        while time.monotonic() < deadline:
+            tick = mt5.symbol_info_tick(symbol)
+            if tick is not None and tick.time:
+                break
+            time.sleep(SYMBOL_READY_POLL)
+
+    registry.add(symbol)
+    return None
+
+
+def login_terminal(account_id, password, broker_name):
+    global current_login
+
+    # Skip the broker round-trip when the terminal is still on this account.
+    # An answer from account_info() also shows the connection is alive.
+    if current_login == (account_id, broker_name):
+        account_info = mt5.account_info()
+        if account_info is not None and account_info.login == account_id:
+            login_stats["hits"] += 1
+            return None
+
+    error = ensure_connection()
+    if error:
+        return error
+
+    login_stats["misses"] += 1
+    current_login = None
+    with timed("login"):
+        logged_in = mt5.login(login=account_id, password=password, server=broker_name)
+    if not logged_in:
+        error_code, error_message = mt5.last_error()
+        return {
+            "success": False,
+            "message": f"Login failed, error code = {error_code}, message = {error_message}",
+        }
+    current_login = (account_id, broker_name)
+    return None
+
+
+def get_terminal_health():
+    terminal_info = mt5.terminal_info()
+    if terminal_info is None:
+        error_code, error_message = mt5.last_error()
+        return {
+            "success": False,
+            "message": f"terminal_info() failed, error code = {error_code}, message = {error_message}",
+        }
+
+    return {
+        "success": True,
+        "message": "Terminal health",
+        "data": {
+            "connected": terminal_info.connected,
+            "ping_last": terminal_info.ping_last,
+            "logged_in": current_login is not None,
+        },
+    }
+
+
+def get_login_stats():
+    return {
+        "success": True,
+        "message": "Login stats",
+        "data": {
+            "logged_in": current_login is not None,
+            "hits": login_stats["hits"],
+            "misses": login_stats["misses"],
+        },
+    }
+
+
+def mt5_login_account(api_id, account_id, password, broker_name):
+    global current_login
+
+    # Make sure the terminal connection is alive
+    error = ensure_connection()
+    if error:
+        return error
+
+    current_login = None
+    with timed("login"):
+        login_result = mt5.login(
+            login=account_id, password=password, server=broker_name
         )
 
+    if login_result:
+        current_login = (account_id, broker_name)
+        random_unique_id = str(uuid.uuid4())
+
+        # The token is stored by the API process with save_account_token, the
+        # terminal is free for the next request as soon as this returns
         return {
             "success": True,
             "message": "Connected to the account successfully",
@@ -165,36 +526,208 @@ def mt5_login_account(api_id, account_id, password, broker_name):
         }
 
 
+def invalidate_account_tokens(api_id):
+    with token_cache_lock:
+        stale_tokens = [
+            token
+            for token, (_, account) in token_cache.items()
+            # SQLite returns api_id as text, the login request may send a number
+            if str(account["api_id"]) == str(api_id)
+        ]
+        for token in stale_tokens:
+            del token_cache[token]
+
+
+def save_account_token(api_id, token, account_id, password, broker_name):
+    # Cached right away so the new token works at once. Only the login request
+    # waits for the store write, the terminal is already free by then.
+    invalidate_account_tokens(api_id)
+    cache_account_token(
+        token,
+        {
+            "api_id": api_id,
+            "account_id": account_id,
+            "password": password,
+            "broker_name": broker_name,
+        },
+    )
+    try:
+        account_store.save(api_id, token, account_id, password, broker_name).result(
+            STORE_TIMEOUT
+        )
+    except Exception as e:
+        # A token that is not stored would stop working once the cache expires
+        invalidate_account_tokens(api_id)
+        return {"success": False, "message": f"Failed to store the account token: {e}"}
+    return None
+
+
+def get_cached_account(token):
+    with token_cache_lock:
+        cached = token_cache.get(token)
+        if cached is not None:
+            expires_at, account = cached
+            if expires_at > time.monotonic():
+                token_cache.move_to_end(token)
+                return dict(account)
+            del token_cache[token]
+    return None
+
+
+def cache_account_token(token, account):
+    with token_cache_lock:
+        token_cache[token] = (time.monotonic() + TOKEN_CACHE_TTL, account)
+        token_cache.move_to_end(token)
+        while len(token_cache) > TOKEN_CACHE_SIZE:
+            token_cache.popitem(last=False)
+
+
+def account_from_store(token, account):
+    # Caches a store lookup, callers get their own copy
+    if not account:
+        return None
+    cache_account_token(token, account)
+    return dict(account)
+
+
 def get_account_by_token(token):
+    account = get_cached_account(token)
+    if account is not None:
+        return account
+
     try:
-        account = accounts_collection.find_one({"token": token})
+        return account_from_store(token, account_store.find_by_token(token))
+    except Exception as e:
+        return {"success": False, "message": f"Database error: {e}"}
 
-        if account:
-            return {
-                "api_id": account["id"],
-                "account_id": account["account_id"],
-                "password": account["password"],
-                "broker_name": account["broker_name"],
-            }
-        else:
-            return None
 
+async def get_account_by_token_async(token):
+    # Same lookup for the event loop, no thread waits for the database
+    account = get_cached_account(token)
+    if account is not None:
+        return account
+
+    try:
+        account = await asyncio.wait_for(
+            asyncio.wrap_future(account_store.submit("find_by_token", token)),
+            STORE_TIMEOUT,
+        )
+        return account_from_store(token, account)
     except Exception as e:
         return {"success": False, "message": f"Database error: {e}"}
 
 
-def get_mt5_positions(symbol=None, order_type=None):
-    # Initialize MetaTrader 5
-    if not mt5.initialize():
-        error_code, error_message = mt5.last_error()
-        return {
-            "success": False,
-            "message": f"initialize() failed, error code = {error_code}, message = {error_message}",
-        }
+POSITION_FIELDS = [
+    "ticket",
+    "symbol",
+    "volume",
+    "type",
+    "price_open",
+    "price_current",
+    "profit",
+    "sl",
+    "tp",
+    "comment",
+]
+
+
+def position_to_dict(position):
+    return {
+        "ticket": position.ticket,
+        "symbol": position.symbol,
+        "volume": position.volume,
+        "type": "Buy" if position.type == mt5.ORDER_TYPE_BUY else "Sell",
+        "price_open": position.price_open,
+        "price_current": position.price_current,
+        "profit": position.profit,
+        "sl": position.sl,
+        "tp": position.tp,
+        "comment": position.comment,
+    }
+
+
+def get_cached_account_info(account_id, broker_name):
+    # Login numbers are only unique per broker server
+    cached = account_info_snapshots.get((account_id, broker_name))
+    if cached is not None and cached[0] > time.monotonic():
+        return cached[1]
+    return None
+
+
+def get_account_info_snapshot(account_id, broker_name, fetch):
+    key = (account_id, broker_name)
+    with account_info_lock:
+        lock = account_info_locks.setdefault(key, threading.Lock())
+
+    # Concurrent polls for the same account wait for a single terminal read
+    with lock:
+        cached = get_cached_account_info(account_id, broker_name)
+        if cached is not None:
+            return cached
+
+        response = fetch()
+        if response.get("success"):
+            account_info_snapshots[key] = (
+                time.monotonic() + ACCOUNT_INFO_TTL,
+                response,
+            )
+        return response
+
+
+def positions_to_array(positions, fields):
+    # One array per column, only for the fields that are filtered or returned
+    if not fields:
+        return {}
+    columns = list(zip(*positions))
+    names = positions[0]._fields
+    return {field: np.array(columns[names.index(field)]) for field in fields}
+
+
+def positions_to_columns(positions_array, indices, fields):
+    columns = {field: positions_array[field][indices].tolist() for field in fields}
+    if "type" in columns:
+        columns["type"] = np.where(
+            positions_array["type"][indices] == mt5.ORDER_TYPE_BUY, "Buy", "Sell"
+        ).tolist()
+    return columns
+
+
+def get_mt5_positions(
+    symbol=None,
+    order_type=None,
+    magic=None,
+    columnar=False,
+    group=None,
+    ticket_from=None,
+    ticket_to=None,
+    min_profit=None,
+    max_profit=None,
+    since=None,
+    cursor=None,
+    limit=None,
+    fields=None,
+):
+    # Make sure the terminal connection is alive
+    error = ensure_connection()
+    if error:
+        return error
+
+    # Only return the requested fields
+    if fields:
+        unknown_fields = [field for field in fields if field not in POSITION_FIELDS]
+        if unknown_fields:
+            return {
+                "success": False,
+                "message": f"Invalid fields: {', '.join(unknown_fields)}. Must be in {', '.join(POSITION_FIELDS)}.",
+            }
+    else:
+        fields = POSITION_FIELDS
 
-    # Fetch positions
+    # Fetch positions, the symbol/group filter runs inside the terminal
     if symbol:
         positions = mt5.positions_get(symbol=symbol)
+    elif group:
+        positions = mt5.positions_get(group=group)
     else:
         positions = mt5.positions_get()
 
@@ -202,6 +735,25 @@ def get_mt5_positions(symbol=None, order_type=None):
     if positions is None or len(positions) == 0:
         return {"success": False, "message": "No positions found."}
 
+    needed_fields = set(fields) if columnar else set()
+    if order_type:
+        needed_fields.add("type")
+    if magic is not None:
+        needed_fields.add("magic")
+    if (
+        ticket_from is not None
+        or ticket_to is not None
+        or cursor is not None
+        or limit is not None
+    ):
+        needed_fields.add("ticket")
+    if min_profit is not None or max_profit is not None:
+        needed_fields.add("profit")
+    if since is not None:
+        needed_fields.add("time")
+    positions_array = positions_to_array(positions, needed_fields)
+    mask = np.ones(len(positions), dtype=bool)
+
     # Filter positions by order type if provided
     if order_type:
         order_type = order_type.capitalize()
@@ -214,23 +766,55 @@ def get_mt5_positions(symbol=None, order_type=None):
         mt5_order_type = (
             mt5.ORDER_TYPE_BUY if order_type == "Buy" else mt5.ORDER_TYPE_SELL
         )
-        positions = [pos for pos in positions if pos.type == mt5_order_type]
+        mask &= positions_array["type"] == mt5_order_type
+
+    # Filter positions by magic number, ticket range, profit and open time
+    if magic is not None:
+        mask &= positions_array["magic"] == magic
+    if ticket_from is not None:
+        mask &= positions_array["ticket"] >= ticket_from
+    if ticket_to is not None:
+        mask &= positions_array["ticket"] <= ticket_to
+    if min_profit is not None:
+        mask &= positions_array["profit"] >= min_profit
+    if max_profit is not None:
+        mask &= positions_array["profit"] <= max_profit
+    if since is not None:
+        mask &= positions_array["time"] >= since
+
+    indices = np.flatnonzero(mask)
+    total = len(indices)
+
+    # Cursor pagination over tickets: pass next_cursor back as cursor
+    next_cursor = None
+    if cursor is not None or limit is not None:
+        indices = indices[np.argsort(positions_array["ticket"][indices], kind="stable")]
+        if cursor is not None:
+            indices = indices[positions_array["ticket"][indices] > cursor]
+        if limit is not None and 0 < limit < len(indices):
+            indices = indices[:limit]
+            next_cursor = int(positions_array["ticket"][indices[-1]])
+
+    # Compact payload: one list per field instead of one dict per position
+    if columnar:
+        return {
+            "success": True,
+            "message": "Positions retrieved successfully.",
+            "data": {
+                "format": "columnar",
+                "count": len(indices),
+                "total": total,
+                "next_cursor": next_cursor,
+                "columns": positions_to_columns(positions_array, indices, fields),
+            },
+        }
 
     # Display each position's details
     positions_list = []
-    for position in positions:
-        pos_dict = {
-            "ticket": position.ticket,
-            "symbol": position.symbol,
-            "volume": position.volume,
-            "type": "Buy" if position.type == mt5.ORDER_TYPE_BUY else "Sell",
-            "price_open": position.price_open,
-            "price_current": position.price_current,
-            "profit": position.profit,
-            "sl": position.sl,
-            "tp": position.tp,
-            "comment": position.comment,
-        }
+    for index in indices:
+        pos_dict = position_to_dict(positions[index])
+        if fields is not POSITION_FIELDS:
+            pos_dict = {field: pos_dict[field] for field in fields}
         positions_list.append(pos_dict)
 
     return {
@@ -238,30 +822,15 @@ def get_mt5_positions(symbol=None, order_type=None):
         "message": "Positions retrieved successfully.",
         "data": {
             "positions": positions_list,
+            "total": total,
+            "next_cursor": next_cursor,
         },
     }
 
 
-def place_mt5_order(
-    action,
-    magic,
-    order=None,
-    symbol=None,
-    volume=None,
-    price=None,
-    stoplimit=None,
-    sl=None,
-    tp=None,
-    deviation=20,
-    order_type=None,
-    type_filling=None,
-    type_time=None,
-    expiration=None,
-    comment="",
-    position=None,
-    position_by=None,
+def check_mt5_order_fields(
+    action, magic, symbol, volume, price, order_type, type_filling, type_time
 ):
-    # Required fields check
     if action is None:
         return {"success": False, "message": "Error: 'action' is a required field."}
     if magic is None:
@@ -297,22 +866,57 @@ def place_mt5_order(
         }
     if type_time is None:
         return {"success": False, "message": "Error: 'type_time' is a required field."}
+    return None
 
-    # Initialize MetaTrader 5
-    if not mt5.initialize():
-        error_code, error_message = mt5.last_error()
-        return {
-            "success": False,
-            "message": f"initialize() failed, error code = {error_code}, message = {error_message}",
-        }
+
+def place_mt5_order(
+    action,
+    magic,
+    order=None,
+    symbol=None,
+    volume=None,
+    price=None,
+    stoplimit=None,
+    sl=None,
+    tp=None,
+    deviation=20,
+    order_type=None,
+    type_filling=None,
+    type_time=None,
+    expiration=None,
+    comment="",
+    position=None,
+    position_by=None,
+    select_symbol=True,
+):
+    # Required fields check
+    error = check_mt5_order_fields(
+        action, magic, symbol, volume, price, order_type, type_filling, type_time
+    )
+    if error:
+        return error
+
+    # Make sure the terminal connection is alive
+    error = ensure_connection()
+    if error:
+        return error
+
+    # Reject symbols the broker server does not offer without a round-trip
+    spec = None
+    if symbol:
+        specs = get_symbol_specs()
+        if specs and symbol not in specs:
+            return {
+                "success": False,
+                "message": f"Error: unknown symbol '{symbol}'.",
+            }
+        spec = specs.get(symbol)
 
     # If a symbol is provided, ensure it is available in MarketWatch
-    if symbol and not mt5.symbol_select(symbol, True):
-        error_code, error_message = mt5.last_error()
-        return {
-            "success": False,
-            "message": f"Failed to select {symbol}, error code = {error_code}, message = {error_message}",
-        }
+    if symbol and select_symbol:
+        error = ensure_symbol_selected(symbol)
+        if error:
+            return error
 
     # Create the order request dictionary
     request = {
@@ -338,8 +942,15 @@ def place_mt5_order(
     # Filter out None values (these are optional parameters)
     request = {k: v for k, v in request.items() if v is not None}
 
+    # Catch orders the broker would reject before sending them
+    if spec is not None:
+        error = validate_mt5_order(request, spec)
+        if error:
+            return error
+
     # Send the order
-    result = mt5.order_send(request)
+    with timed("order_send"):
+        result = mt5.order_send(request)
 
     if result is None:
         error_code, error_message = mt5.last_error()
@@ -361,16 +972,147 @@ def place_mt5_order(
     }
 
 
+def validate_mt5_order(request, spec):
+    action = request.get("action")
+    if action not in [mt5.TRADE_ACTION_DEAL, mt5.TRADE_ACTION_PENDING]:
+        return None
+
+    symbol = spec["name"]
+    order_type = request.get("type")
+    is_buy = order_type in [
+        mt5.ORDER_TYPE_BUY,
+        mt5.ORDER_TYPE_BUY_LIMIT,
+        mt5.ORDER_TYPE_BUY_STOP,
+        mt5.ORDER_TYPE_BUY_STOP_LIMIT,
+    ]
+    closing = "position" in request
+
+    # Trade mode
+    trade_mode = spec["trade_mode"]
+    if trade_mode == mt5.SYMBOL_TRADE_MODE_DISABLED:
+        return {"success": False, "message": f"Error: trading is disabled for {symbol}."}
+    if trade_mode == mt5.SYMBOL_TRADE_MODE_CLOSEONLY and not closing:
+        return {"success": False, "message": f"Error: {symbol} is close only."}
+    if trade_mode == mt5.SYMBOL_TRADE_MODE_LONGONLY and not is_buy and not closing:
+        return {"success": False, "message": f"Error: {symbol} is long only."}
+    if trade_mode == mt5.SYMBOL_TRADE_MODE_SHORTONLY and is_buy and not closing:
+        return {"success": False, "message": f"Error: {symbol} is short only."}
+
+    # Volume limits and step
+    volume = request.get("volume")
+    if volume is not None:
+        if volume < spec["volume_min"] or volume > spec["volume_max"]:
+            return {
+                "success": False,
+                "message": f"Error: volume {volume} is outside [{spec['volume_min']}, {spec['volume_max']}] for {symbol}.",
+            }
+        steps = (volume - spec["volume_min"]) / spec["volume_step"]
+        if abs(steps - round(steps)) > 1e-6:
+            return {
+                "success": False,
+                "message": f"Error: volume {volume} is not a multiple of {spec['volume_step']} for {symbol}.",
+            }
+
+    # Filling mode, checked against the SYMBOL_FILLING_* bitmask
+    type_filling = request.get("type_filling")
+    if action == mt5.TRADE_ACTION_DEAL:
+        if type_filling == mt5.ORDER_FILLING_FOK:
+            allowed = spec["filling_mode"] & mt5.SYMBOL_FILLING_FOK
+        elif type_filling == mt5.ORDER_FILLING_IOC:
+            allowed = spec["filling_mode"] & mt5.SYMBOL_FILLING_IOC
+        elif type_filling == mt5.ORDER_FILLING_RETURN:
+            allowed = spec["trade_exemode"] != mt5.SYMBOL_TRADE_EXECUTION_MARKET
+        else:
+            allowed = True
+        if not allowed:
+            return {
+                "success": False,
+                "message": f"Error: filling mode {type_filling} is not allowed for {symbol}.",
+            }
+
+    # Stops level: sl/tp must be at least trade_stops_level points away
+    stops_distance = spec["trade_stops_level"] * spec["point"]
+    sl = request.get("sl")
+    tp = request.get("tp")
+    borderline = False
+    if stops_distance and (sl or tp):
+        # Pending orders are checked against their own price. A market
+        # position's stops trigger on the closing side of the quote: Bid
+        # for buys, Ask for sells.
+        price = request.get("price")
+        if action == mt5.TRADE_ACTION_DEAL:
+            tick = mt5.symbol_info_tick(symbol)
+            price = (tick.bid if is_buy else tick.ask) if tick is not None else None
+        if price:
+            for name, level in [("sl", sl), ("tp", tp)]:
+                if not level:
+                    continue
+                distance = price - level if (name == "sl") == is_buy else level - price
+                if distance < stops_distance:
+                    return {
+                        "success": False,
+                        "message": f"Error: {name} {level} is closer than {spec['trade_stops_level']} points to {price} for {symbol}.",
+                    }
+                if distance < stops_distance + 2 * spec["point"]:
+                    borderline = True
+
+    # Prices move, let the terminal confirm orders close to the stops level
+    if borderline and ORDER_CHECK_BORDERLINE:
+        result = mt5.order_check(request)
+        if result is not None and result.retcode not in [0, mt5.TRADE_RETCODE_DONE]:
+            return {
+                "success": False,
+                "message": f"Order check failed, retcode={result.retcode}, message={result.comment}",
+            }
+
+    return None
+
+
+def place_mt5_orders(orders, pipeline=False):
+    # Make sure the terminal connection is alive
+    error = ensure_connection()
+    if error:
+        return error
+
+    batch_start_time = time.perf_counter()
+
+    # In pipeline mode every symbol is selected once up front and the orders
+    # are sent back-to-back without per-order preparation
+    failed_symbols = {}
+    if pipeline:
+        for symbol in {order.get("symbol") for order in orders if order.get("symbol")}:
+            error = ensure_symbol_selected(symbol)
+            if error:
+                failed_symbols[symbol] = error["message"]
+
+    results = []
+    for order in orders:
+        start_time = time.perf_counter()
+        if order.get("symbol") in failed_symbols:
+            result = {"success": False, "message": failed_symbols[order["symbol"]]}
+        else:
+            result = place_mt5_order(**order, select_symbol=not pipeline)
+        result["time"] = time.perf_counter() - start_time
+        results.append(result)
+
+    placed = sum(1 for result in results if result["success"])
+    return {
+        "success": placed == len(results),
+        "message": f"{placed} of {len(results)} orders placed",
+        "data": {
+            "results": results,
+            "time": time.perf_counter() - batch_start_time,
+        },
+    }
+
+
 def close_positions_by_ticket_id(
     position_ticket, volume=None, deviation=20, comment="Python close position"
 ):
-    # Initialize MetaTrader 5
-    if not mt5.initialize():
-        error_code, error_message = mt5.last_error()
-        return {
-            "success": False,
-            "message": f"initialize() failed, error code = {error_code}, message = {error_message}",
-        }
+    # Make sure the terminal connection is alive
+    error = ensure_connection()
+    if error:
+        return error
 
     # Get the position details
     position = mt5.positions_get(ticket=position_ticket)
@@ -385,6 +1127,12 @@ def close_positions_by_ticket_id(
         0
     ]  # Get the first position (should be the only one with the ticket)
 
+    return close_mt5_position(
+        position, volume=volume, deviation=deviation, comment=comment
+    )
+
+
+def close_mt5_position(position, volume=None, deviation=20, comment=""):
     # Determine the action (buy or sell) to close the position
     action = mt5.TRADE_ACTION_DEAL
     if position.type == mt5.ORDER_TYPE_BUY:
@@ -407,7 +1155,7 @@ def close_positions_by_ticket_id(
         "symbol": position.symbol,
         "volume": volume,
         "type": order_type,
-        "position": position_ticket,  # Specify the position to close
+        "position": position.ticket,  # Specify the position to close
         "deviation": deviation,
         "comment": comment,
         "type_filling": mt5.ORDER_FILLING_FOK,  # Fill or Kill
@@ -415,7 +1163,15 @@ def close_positions_by_ticket_id(
     }
 
     # Send the order to close the position
-    result = mt5.order_send(request)
+    with timed("order_send"):
+        result = mt5.order_send(request)
+
+    if result is None:
+        error_code, error_message = mt5.last_error()
+        return {
+            "success": False,
+            "message": f"Failed to close position, error code = {error_code}, message = {error_message}",
+        }
 
     # Check the result
     if result.retcode != mt5.TRADE_RETCODE_DONE:
@@ -430,24 +1186,79 @@ def close_positions_by_ticket_id(
     }
 
 
-def get_subscribed_symbols():
-    # Initialize MetaTrader 5
-    if not mt5.initialize():
+def close_mt5_positions(
+    symbol=None,
+    order_type=None,
+    magic=None,
+    tickets=None,
+    deviation=20,
+    comment="Python close position",
+):
+    # Make sure the terminal connection is alive
+    error = ensure_connection()
+    if error:
+        return error
+
+    if order_type:
+        order_type = order_type.capitalize()
+        if order_type not in ["Buy", "Sell"]:
+            return {
+                "success": False,
+                "message": "Invalid order type. Must be 'Buy' or 'Sell'.",
+            }
+        order_type = mt5.ORDER_TYPE_BUY if order_type == "Buy" else mt5.ORDER_TYPE_SELL
+
+    # Fetch all matching positions with a single call
+    if symbol:
+        positions = mt5.positions_get(symbol=symbol)
+    else:
+        positions = mt5.positions_get()
+
+    if positions is None:
         error_code, error_message = mt5.last_error()
         return {
             "success": False,
-            "message": f"initialize() failed, error code = {error_code}, message = {error_message}",
+            "message": f"Failed to get positions, error code = {error_code}, message = {error_message}",
         }
 
-    # Fetch subscribed symbols
-    symbols = mt5.symbols_get()
+    if order_type is not None:
+        positions = [pos for pos in positions if pos.type == order_type]
+    if magic is not None:
+        positions = [pos for pos in positions if pos.magic == magic]
+    if tickets is not None:
+        tickets = set(tickets)
+        positions = [pos for pos in positions if pos.ticket in tickets]
+
+    # Submit the closing deals back-to-back
+    results = []
+    for position in positions:
+        result = close_mt5_position(position, deviation=deviation, comment=comment)
+        result["ticket"] = position.ticket
+        results.append(result)
+
+    closed = sum(1 for result in results if result["success"])
+    return {
+        "success": closed == len(results),
+        "message": f"{closed} of {len(results)} positions closed",
+        "data": {"results": results},
+    }
+
+
+def get_subscribed_symbols(refresh=False):
+    # Make sure the terminal connection is alive
+    error = ensure_connection()
+    if error:
+        return error
+
+    # Read the subscribed symbols from the metadata cache
+    specs = get_symbol_specs(refresh=refresh)
 
     # Handle the case where no symbols are found
-    if symbols is None or len(symbols) == 0:
+    if not specs:
         return {"success": False, "message": "No subscribed symbols found."}
 
     # Create a list of symbol names
-    subscribed_symbols = [symbol.name for symbol in symbols]
+    subscribed_symbols = list(specs)
 
     return {
         "success": True,
@@ -459,21 +1270,15 @@ def get_subscribed_symbols():
 
 
 def get_mt5_symbol_info(symbol=None):
-    # Initialize MetaTrader 5
-    if not mt5.initialize():
-        error_code, error_message = mt5.last_error()
-        return {
-            "success": False,
-            "message": f"initialize() failed, error code = {error_code}, message = {error_message}",
-        }
+    # Make sure the terminal connection is alive
+    error = ensure_connection()
+    if error:
+        return error
+
+    error = ensure_symbol_selected(symbol)
+    if error:
+        return error
 
-    if not mt5.symbol_select(symbol, True):
-        error_code, error_message = mt5.last_error()
-        return {
-            "success": False,
-            "message": f"Failed to select {symbol}, error code = {error_code}, message = {error_message}",
-        }
-    time.sleep(0.2)
     # Fetch subscribed symbols
     symbol_info = mt5.symbol_info(symbol)
 
@@ -508,22 +1313,91 @@ def get_mt5_symbol_info(symbol=None):
     }
 
 
-def get_mt5_account_info():
-    # Initialize MetaTrader 5
-    if not mt5.initialize():
+def tick_to_dict(tick):
+    return {
+        "bid": tick.bid,
+        "ask": tick.ask,
+        "last": tick.last,
+        "time": tick.time,
+    }
+
+
+def get_mt5_symbol_ticks(symbols):
+    # Make sure the terminal connection is alive
+    error = ensure_connection()
+    if error:
+        return error
+
+    ticks = {}
+    missing = []
+    for symbol in symbols:
+        tick = None
+        if not ensure_symbol_selected(symbol):
+            tick = mt5.symbol_info_tick(symbol)
+        if tick is None:
+            missing.append(symbol)
+        else:
+            ticks[symbol] = tick_to_dict(tick)
+
+    return {
+        "success": True,
+        "message": "Symbol ticks retrieved successfully.",
+        "data": {
+            "ticks": ticks,
+            "missing": missing,
+        },
+    }
+
+
+def get_mt5_stream_snapshot(symbols=()):
+    # Make sure the terminal connection is alive
+    error = ensure_connection()
+    if error:
+        return error
+
+    positions = mt5.positions_get()
+    if positions is None:
         error_code, error_message = mt5.last_error()
         return {
             "success": False,
-            "message": f"initialize() failed, error code = {error_code}, message = {error_message}",
+            "message": f"Failed to get positions, error code = {error_code}, message = {error_message}",
         }
 
-    # Fetch subscribed symbols
+    ticks = {}
+    for symbol in symbols:
+        if ensure_symbol_selected(symbol):
+            continue
+        tick = mt5.symbol_info_tick(symbol)
+        if tick is not None:
+            ticks[symbol] = tick_to_dict(tick)
+
+    return {
+        "success": True,
+        "message": "Stream snapshot",
+        "data": {
+            "positions": [position_to_dict(position) for position in positions],
+            "ticks": ticks,
+        },
+    }
+
+
+def get_mt5_account_info():
+    # Make sure the terminal connection is alive
+    error = ensure_connection()
+    if error:
+        return error
+
+    # Fetch the account info
     account_info = mt5.account_info()
 
-    info = {}
-    for attr in dir(account_info):
-        if not attr.startswith("__") and not callable(getattr(account_info, attr)):
-            info[attr] = getattr(account_info, attr)
+    if account_info is None:
+        error_code, error_message = mt5.last_error()
+        return {
+            "success": False,
+            "message": f"Failed to get account info, error code = {error_code}, message = {error_message}",
+        }
+
+    info = account_info._asdict()
 
     return {
         "success": True,
@@ -0,0 +1,133 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+
+from terminal_pool import terminal_pool
+
+
+# Seconds a finished job, and its idempotency key, can still be looked up
+JOB_TTL = 24 * 60 * 60
+
+
+class OrderJob:
+    def __init__(self, account, order, idempotency_key=None):
+        self.job_id = str(uuid.uuid4())
+        self.account = account
+        self.account_id = account["account_id"]
+        self.order = order
+        self.idempotency_key = idempotency_key
+        self.status = "queued"
+        self.result = None
+        self.submitted_at = time.time()
+        self.finished_at = None
+        self.done = threading.Event()
+        self.callbacks = []
+        self.lock = threading.Lock()
+
+    def on_done(self, callback):
+        # Called on the queue thread once the job is done, or right away
+        with self.lock:
+            if not self.done.is_set():
+                self.callbacks.append(callback)
+                return
+        callback()
+
+    def finish(self, result):
+        self.result = result
+        self.status = "done"
+        self.finished_at = time.time()
+        with self.lock:
+            self.done.set()
+            callbacks, self.callbacks = self.callbacks, []
+        for callback in callbacks:
+            callback()
+
+    def to_dict(self):
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "idempotency_key": self.idempotency_key,
+            "submitted_at": self.submitted_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+        }
+
+
+class OrderQueue:
+    # Orders are queued per account and drained in order by one thread per
+    # account, which sends them through the account's terminal worker
+
+    def __init__(self):
+        self.jobs = OrderedDict()
+        self.idempotency_keys = {}
+        self.queues = {}
+        self.lock = threading.Lock()
+
+    def submit(self, account, order, idempotency_key=None):
+        with self.lock:
+            self.purge()
+
+            # A retry with the same key gets the original job, not a new fill
+            if idempotency_key is not None:
+                job_id = self.idempotency_keys.get(
+                    (account["account_id"], idempotency_key)
+                )
+                if job_id is not None:
+                    return self.jobs[job_id], False
+
+            job = OrderJob(account, order, idempotency_key)
+            self.jobs[job.job_id] = job
+            if idempotency_key is not None:
+                self.idempotency_keys[(job.account_id, idempotency_key)] = job.job_id
+
+            account_queue = self.queues.get(job.account_id)
+            if account_queue is None:
+                account_queue = deque()
+                self.queues[job.account_id] = account_queue
+                threading.Thread(
+                    target=self.drain, args=(job.account_id,), daemon=True
+                ).start()
+            account_queue.append(job)
+            return job, True
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def purge(self):
+        # Jobs are kept in submission order, drop the expired finished ones
+        expired_before = time.time() - JOB_TTL
+        while self.jobs:
+            job = next(iter(self.jobs.values()))
+            if job.finished_at is None or job.finished_at > expired_before:
+                break
+            del self.jobs[job.job_id]
+            if job.idempotency_key is not None:
+                self.idempotency_keys.pop((job.account_id, job.idempotency_key), None)
+
+    def drain(self, account_id):
+        while True:
+            with self.lock:
+                account_queue = self.queues[account_id]
+                if not account_queue:
+                    del self.queues[account_id]
+                    return
+                job = account_queue.popleft()
+
+            job.status = "running"
+            worker = terminal_pool.worker_for(account_id)
+            try:
+                if worker is None:
+                    result = {"success": False, "message": "No terminal available"}
+                else:
+                    with worker.lock:
+                        result = worker.call(
+                            job.account, "place_mt5_order", **job.order
+                        )
+            except Exception as e:
+                result = {"success": False, "message": f"Order queue error: {e}"}
+            job.finish(result)
+
+
+order_queue = OrderQueue()
@@ -0,0 +1,65 @@
+import itertools
+import queue
+import threading
+
+from mt5 import provision_terminal
+
+
+class TerminalImagePool:
+    # Spare terminal directories that are already copied and started, handed
+    # out to new terminal workers and refilled in the background
+
+    def __init__(self):
+        self.images = queue.Queue()
+        self.terminal_ids = None
+        self.size = 0
+        self.provision_mode = "copy"
+        self.refill_needed = threading.Event()
+        self.lock = threading.Lock()
+
+    def start(self, base_terminal_id, size=1, provision_mode="copy", reuse_ids=()):
+        # Warm restart: terminals of the previous run are handed out first
+        for terminal_id in reuse_ids:
+            self.images.put(terminal_id)
+        self.terminal_ids = itertools.count(
+            max([base_terminal_id, *(terminal_id + 1 for terminal_id in reuse_ids)])
+        )
+        self.size = size
+        self.provision_mode = provision_mode
+        threading.Thread(target=self.refill, daemon=True).start()
+        self.refill_needed.set()
+
+    def next_terminal_id(self):
+        with self.lock:
+            return next(self.terminal_ids)
+
+    def provision(self, terminal_id=None):
+        if terminal_id is None:
+            terminal_id = self.next_terminal_id()
+        provision_terminal(terminal_id, self.provision_mode)
+        return terminal_id
+
+    def take(self):
+        try:
+            terminal_id = self.images.get_nowait()
+            # Starts the terminal again if it exited, otherwise a no-op
+            self.provision(terminal_id)
+        except queue.Empty:
+            # Pool is drained, provision one on the spot
+            terminal_id = self.provision()
+        self.refill_needed.set()
+        return terminal_id
+
+    def refill(self):
+        while True:
+            self.refill_needed.wait()
+            self.refill_needed.clear()
+            while self.images.qsize() < self.size:
+                try:
+                    self.images.put(self.provision())
+                except Exception as e:
+                    print(f"Failed to provision a spare terminal: {e}")
+                    break
+
+
+terminal_images = TerminalImagePool()
@@ -0,0 +1,278 @@
+import asyncio
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from mt5 import remove_account
+from terminal_images import terminal_images
+
+
+# Seconds a terminal call may take before the caller gets an error
+REQUEST_TIMEOUT = 120
+# Health probes: interval, timeout and slowest acceptable answer, in seconds
+PROBE_INTERVAL = 10
+PROBE_TIMEOUT = 5
+PROBE_MAX_LATENCY = 2
+# Consecutive failed probes before a terminal is restarted
+PROBE_FAILURES = 3
+# Consecutive timed out calls before a terminal is taken out of routing
+CALL_TIMEOUTS = 2
+# Seconds a new worker gets to attach to its terminal before it is probed
+START_GRACE = 90
+# Restart backoff for terminals that keep failing, in seconds
+RESTART_BACKOFF = 5
+RESTART_BACKOFF_MAX = 300
+
+
+def _worker_main(terminal_id, conn):
+    # Each worker process owns exactly one portable terminal, the MetaTrader5
+    # package can only be attached to a single terminal per process.
+    import mt5 as mt5_service
+
+    error = mt5_service.attach_terminal(terminal_id)
+    if error:
+        # The supervisor sees the dead worker and restarts it
+        print(f"Terminal {terminal_id}: {error['message']}")
+        return
+
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            # The API process is gone, the terminal stays up for a warm restart
+            return
+        if message is None:
+            break
+
+        seq, account, func_name, args, kwargs = message
+        mt5_service.stage_timings.clear()
+        mt5_service.connection_checked = False
+        try:
+            result = None
+            if account is not None:
+                result = mt5_service.login_terminal(
+                    account["account_id"], account["password"], account["broker_name"]
+                )
+                # One connection check per message, not one per helper
+                mt5_service.connection_checked = result is None
+            if result is None:
+                result = getattr(mt5_service, func_name)(*args, **kwargs)
+        except Exception as e:
+            result = {"success": False, "message": f"Terminal worker error: {e}"}
+        conn.send((seq, result, dict(mt5_service.stage_timings)))
+
+    mt5_service.remove_account(terminal_id)
+
+
+class TerminalWorker:
+    def __init__(self, terminal_id, restart_delay=RESTART_BACKOFF):
+        self.terminal_id = terminal_id
+        # Only covers this worker's terminal, other workers run in parallel
+        self.lock = threading.Lock()
+        self.accounts = set()
+        self.available = True
+        self.failures = 0
+        self.timeouts = 0
+        self.seq = 0
+        # Stage timings of the last call, read by the caller under self.lock
+        self.last_timings = {}
+        self.started_at = None
+        self.restart_delay = restart_delay
+        # Runs the calls of async callers one after another, a waiting caller
+        # holds a future instead of a thread blocked on self.lock
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.conn, child_conn = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(
+            target=_worker_main, args=(terminal_id, child_conn), daemon=True
+        )
+
+    def start(self):
+        self.started_at = time.monotonic()
+        self.process.start()
+
+    def stop(self):
+        self.executor.shutdown(wait=False)
+        try:
+            self.conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(timeout=10)
+        if self.process.is_alive():
+            self.process.terminate()
+
+    def submit(self, fn, *args, **kwargs):
+        # Awaitable from the event loop, fn takes self.lock itself
+        return asyncio.wrap_future(self.executor.submit(fn, *args, **kwargs))
+
+    def call(self, account, func_name, *args, **kwargs):
+        # The caller must hold self.lock
+        return self.call_with_timeout(
+            REQUEST_TIMEOUT, account, func_name, *args, **kwargs
+        )
+
+    def call_with_timeout(self, timeout, account, func_name, *args, **kwargs):
+        # The caller must hold self.lock
+        self.seq += 1
+        seq = self.seq
+        self.last_timings = {}
+        try:
+            self.conn.send((seq, account, func_name, args, kwargs))
+            deadline = time.monotonic() + timeout
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self.conn.poll(remaining):
+                    # A hung terminal stops getting traffic, the supervisor
+                    # restarts it
+                    self.timeouts += 1
+                    if self.timeouts >= CALL_TIMEOUTS:
+                        self.available = False
+                    return {
+                        "success": False,
+                        "message": f"Terminal {self.terminal_id} did not respond in time",
+                    }
+                response_seq, result, timings = self.conn.recv()
+                # Older answers belong to calls that already timed out
+                if response_seq == seq:
+                    self.timeouts = 0
+                    self.last_timings = timings
+                    return result
+        except (EOFError, OSError) as e:
+            self.available = False
+            return {
+                "success": False,
+                "message": f"Terminal {self.terminal_id} is unavailable: {e}",
+            }
+
+
+class TerminalPool:
+    def __init__(self):
+        self.workers = []
+        self.assignments = {}
+        self.lock = threading.Lock()
+
+    def start(self, size=1, wait=False):
+        # By default terminals come up in the background, requests get
+        # "No terminal available" until the first worker is added
+        if wait:
+            self.add_workers(size)
+        else:
+            threading.Thread(target=self.add_workers, args=(size,), daemon=True).start()
+
+    def add_workers(self, size):
+        for _ in range(size):
+            self.add_worker()
+        print(f"Started {size} terminal worker(s)")
+
+    def add_worker(self):
+        # Each worker attaches to a pre-provisioned terminal image
+        worker = TerminalWorker(terminal_images.take())
+        worker.start()
+        with self.lock:
+            self.workers.append(worker)
+        return worker
+
+    def stop(self):
+        for worker in self.workers:
+            worker.stop()
+        self.workers = []
+        self.assignments = {}
+
+    def worker_for(self, account_id):
+        # Sticky routing: an account stays on the worker that holds its session,
+        # new accounts go to the worker with the fewest accounts. Accounts of
+        # an unavailable worker move to a healthy one.
+        with self.lock:
+            worker = self.assignments.get(account_id)
+            if worker is not None and worker.available:
+                return worker
+
+            available_workers = [w for w in self.workers if w.available]
+            if not available_workers:
+                return None
+
+            if worker is not None:
+                worker.accounts.discard(account_id)
+            worker = min(available_workers, key=lambda w: len(w.accounts))
+            worker.accounts.add(account_id)
+            self.assignments[account_id] = worker
+            return worker
+
+    def supervise(self, interval=PROBE_INTERVAL):
+        threading.Thread(
+            target=self.run_supervisor, args=(interval,), daemon=True
+        ).start()
+
+    def run_supervisor(self, interval):
+        while True:
+            time.sleep(interval)
+            for worker in list(self.workers):
+                try:
+                    self.check(worker)
+                except Exception as e:
+                    print(f"Terminal {worker.terminal_id} supervisor error: {e}")
+
+    def check(self, worker):
+        now = time.monotonic()
+        if not worker.process.is_alive():
+            worker.available = False
+        elif worker.available and now - worker.started_at > START_GRACE:
+            healthy = self.probe(worker)
+            if healthy:
+                worker.failures = 0
+            elif healthy is not None:
+                worker.failures += 1
+                print(
+                    f"Terminal {worker.terminal_id} failed health probe ({worker.failures}/{PROBE_FAILURES})"
+                )
+                if worker.failures >= PROBE_FAILURES:
+                    worker.available = False
+
+        # Terminals that fail shortly after a restart wait out their backoff
+        if not worker.available and now - worker.started_at >= worker.restart_delay:
+            self.restart(worker)
+
+    def probe(self, worker):
+        # A busy worker gives no result this round, a hung call is caught by
+        # the call timeouts
+        if not worker.lock.acquire(timeout=PROBE_TIMEOUT):
+            return None
+        try:
+            start_time = time.monotonic()
+            health = worker.call_with_timeout(
+                PROBE_TIMEOUT, None, "get_terminal_health"
+            )
+            latency = time.monotonic() - start_time
+        finally:
+            worker.lock.release()
+
+        if not health.get("success"):
+            return False
+        # A terminal without an account is not expected to be connected
+        if health["data"]["logged_in"] and not health["data"]["connected"]:
+            return False
+        return latency <= PROBE_MAX_LATENCY
+
+    def restart(self, worker):
+        print(f"Restarting terminal {worker.terminal_id}")
+        worker.process.terminate()
+        worker.process.join(timeout=10)
+        remove_account(worker.terminal_id)
+
+        # Back off when the previous terminal did not survive for long
+        if time.monotonic() - worker.started_at < RESTART_BACKOFF_MAX:
+            restart_delay = min(worker.restart_delay * 2, RESTART_BACKOFF_MAX)
+        else:
+            restart_delay = RESTART_BACKOFF
+
+        new_worker = TerminalWorker(terminal_images.take(), restart_delay)
+        new_worker.start()
+        with self.lock:
+            self.workers[self.workers.index(worker)] = new_worker
+            new_worker.accounts = worker.accounts
+            for account_id in new_worker.accounts:
+                self.assignments[account_id] = new_worker
+        worker.executor.shutdown(wait=False)
+
+
+terminal_pool = TerminalPool()
@@ -0,0 +1,46 @@
+import os
+import sys
+
+import pytest
+
+# The fake MetaTrader5 backend is picked when mt5 is first imported, its
+# latencies are read from the environment at the same time
+os.environ["MT5_BACKEND"] = "fake"
+os.environ["FAKE_MT5_LATENCY"] = "0"
+os.environ["FAKE_MT5_LOGIN_LATENCY"] = "0"
+os.environ["FAKE_MT5_ORDER_LATENCY"] = "0"
+os.environ["FAKE_MT5_POSITIONS"] = "0"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fake_mt5  # noqa: E402
+import mt5  # noqa: E402
+from account_store import account_store  # noqa: E402
+
+
+@pytest.fixture
+def terminal():
+    # A connected fake terminal, logged in with no open positions
+    fake_mt5.configure(failure_rate=0, seed=0)
+    fake_mt5.initialize()
+    fake_mt5.login(1000, password="secret", server="FakeBroker-Demo")
+    fake_mt5.state["positions"] = {}
+    yield fake_mt5
+    fake_mt5.shutdown()
+    mt5.current_login = None
+
+
+@pytest.fixture
+def add_position(terminal):
+    def add(ticket, symbol="EURUSD", type=0, magic=0, profit=0.0, time=0):
+        terminal.state["positions"][ticket] = terminal.TradePosition(
+            ticket, time, time * 1000, time, time * 1000, type, magic, ticket, 0,
+            0.01, 1.1, 0.0, 0.0, 1.1, 0.0, profit, symbol, "", "",
+        )
+
+    return add
+
+
+@pytest.fixture(scope="session", autouse=True)
+def memory_store():
+    account_store.open("memory")
+    return account_store
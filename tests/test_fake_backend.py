@@ -0,0 +1,297 @@
+import asyncio
+
+import pytest
+
+import fake_mt5
+import mt5
+from account_store import MemoryAccountStore, account_store
+from app.api.accounts import authenticate, close_positions_call
+from order_queue import OrderQueue
+from terminal_pool import terminal_pool
+
+
+def run_steps(steps, results):
+    # Drives a shared route, answering each yielded step from results
+    result = None
+    try:
+        while True:
+            step = steps.send(result)
+            result = results[step[0]]
+    except StopIteration as stop:
+        return stop.value
+
+
+class Request:
+    def __init__(self, headers):
+        self.headers = headers
+
+
+# validate_mt5_order
+
+
+@pytest.fixture
+def spec(terminal, monkeypatch):
+    # EURUSD with a 10 point stops level, Bid 1.10000 / Ask 1.10020
+    spec = mt5.symbol_info_to_spec(fake_mt5.symbol_info("EURUSD"))
+    spec["trade_stops_level"] = 10
+    monkeypatch.setattr(
+        fake_mt5,
+        "symbol_info_tick",
+        lambda symbol: fake_mt5.Tick(0, 1.1, 1.1002, 1.1, 0, 0, 0, 0.0),
+    )
+    return spec
+
+
+def market_order(order_type, **fields):
+    return {
+        "action": fake_mt5.TRADE_ACTION_DEAL,
+        "symbol": "EURUSD",
+        "volume": 0.01,
+        "type": order_type,
+        "type_filling": fake_mt5.ORDER_FILLING_IOC,
+        **fields,
+    }
+
+
+def test_market_buy_stops_are_checked_against_bid(spec):
+    # 5 points below Bid: too close, although 25 points below Ask
+    order = market_order(fake_mt5.ORDER_TYPE_BUY, sl=1.09995)
+    assert mt5.validate_mt5_order(order, spec)["success"] is False
+
+    order = market_order(fake_mt5.ORDER_TYPE_BUY, sl=1.0995, tp=1.1010)
+    assert mt5.validate_mt5_order(order, spec) is None
+
+
+def test_market_sell_stops_are_checked_against_ask(spec):
+    order = market_order(fake_mt5.ORDER_TYPE_SELL, tp=1.10015)
+    assert mt5.validate_mt5_order(order, spec)["success"] is False
+
+    order = market_order(fake_mt5.ORDER_TYPE_SELL, sl=1.1010, tp=1.0990)
+    assert mt5.validate_mt5_order(order, spec) is None
+
+
+def test_pending_stops_are_checked_against_the_order_price(spec):
+    order = {
+        "action": fake_mt5.TRADE_ACTION_PENDING,
+        "symbol": "EURUSD",
+        "volume": 0.01,
+        "type": fake_mt5.ORDER_TYPE_BUY_LIMIT,
+        "price": 1.09,
+        "sl": 1.08995,
+    }
+    assert mt5.validate_mt5_order(order, spec)["success"] is False
+
+    order["sl"] = 1.0895
+    assert mt5.validate_mt5_order(order, spec) is None
+
+
+def test_volume_and_trade_mode_limits(spec):
+    order = market_order(fake_mt5.ORDER_TYPE_BUY, volume=0.015)
+    assert "multiple" in mt5.validate_mt5_order(order, spec)["message"]
+
+    order = market_order(fake_mt5.ORDER_TYPE_BUY, volume=1000)
+    assert "outside" in mt5.validate_mt5_order(order, spec)["message"]
+
+    spec["trade_mode"] = fake_mt5.SYMBOL_TRADE_MODE_LONGONLY
+    order = market_order(fake_mt5.ORDER_TYPE_SELL)
+    assert "long only" in mt5.validate_mt5_order(order, spec)["message"]
+    # Closing a position is still allowed
+    order["position"] = 1
+    assert mt5.validate_mt5_order(order, spec) is None
+
+
+# get_mt5_positions
+
+
+def test_positions_cursor_pagination(add_position):
+    for ticket in [7, 3, 9, 1, 5]:
+        add_position(ticket)
+
+    page = mt5.get_mt5_positions(limit=2)["data"]
+    assert [p["ticket"] for p in page["positions"]] == [1, 3]
+    assert page["next_cursor"] == 3
+    assert page["total"] == 5
+
+    page = mt5.get_mt5_positions(cursor=3, limit=2)["data"]
+    assert [p["ticket"] for p in page["positions"]] == [5, 7]
+    assert page["next_cursor"] == 7
+
+    page = mt5.get_mt5_positions(cursor=7, limit=2)["data"]
+    assert [p["ticket"] for p in page["positions"]] == [9]
+    assert page["next_cursor"] is None
+
+
+def test_positions_filters_and_projection(add_position):
+    add_position(1, type=0, magic=1000, profit=10.0, time=100)
+    add_position(2, type=1, magic=1000, profit=-5.0, time=200)
+    add_position(3, type=0, magic=2000, profit=20.0, time=300)
+
+    response = mt5.get_mt5_positions(
+        order_type="buy", magic=1000, fields=["ticket", "profit"]
+    )
+    assert response["data"]["positions"] == [{"ticket": 1, "profit": 10.0}]
+
+    response = mt5.get_mt5_positions(min_profit=0, since=200)
+    assert [p["ticket"] for p in response["data"]["positions"]] == [3]
+
+    response = mt5.get_mt5_positions(fields=["ticket", "password"])
+    assert response["success"] is False
+
+
+def test_positions_columnar(add_position):
+    add_position(1, symbol="EURUSD", profit=1.5)
+    add_position(2, symbol="GBPUSD", profit=-2.5)
+
+    data = mt5.get_mt5_positions(columnar=True, fields=["ticket", "symbol", "profit"])[
+        "data"
+    ]
+    assert data["columns"] == {
+        "ticket": [1, 2],
+        "symbol": ["EURUSD", "GBPUSD"],
+        "profit": [1.5, -2.5],
+    }
+    assert data["count"] == 2
+
+
+# close_positions_call
+
+
+def test_close_positions_call_needs_a_filter():
+    call, error = close_positions_call({}, "api")
+    assert call is None
+    assert "Missing required fields" in error["error"]
+
+
+def test_close_positions_call_single_ticket():
+    call, error = close_positions_call({"ticket_id": "42", "volume": 0.01}, "api")
+    assert error is None
+    func_name, args, kwargs = call
+    assert func_name == "close_positions_by_ticket_id"
+    assert args == (42,)
+    assert kwargs["volume"] == 0.01
+
+
+def test_close_positions_call_converts_magic():
+    (func_name, _, kwargs), _ = close_positions_call({"magic": "1000"}, "api")
+    assert func_name == "close_mt5_positions"
+    assert kwargs["magic"] == 1000
+
+
+def test_empty_tickets_never_widen_the_filter(add_position):
+    add_position(1, symbol="EURUSD")
+    add_position(2, symbol="EURUSD")
+
+    (func_name, args, kwargs), error = close_positions_call(
+        {"symbol": "EURUSD", "tickets": []}, "api"
+    )
+    assert error is None
+    assert kwargs["tickets"] == []
+
+    response = getattr(mt5, func_name)(*args, **kwargs)
+    assert response["data"]["results"] == []
+    assert sorted(fake_mt5.state["positions"]) == [1, 2]
+
+
+# OrderQueue
+
+
+@pytest.fixture
+def order_queue():
+    # No terminal workers: queued jobs finish with "No terminal available"
+    return OrderQueue()
+
+
+def test_idempotency_key_returns_the_original_job(order_queue):
+    account = {"account_id": 1}
+    job, created = order_queue.submit(account, {"volume": 0.01}, "key-1")
+    retry, retry_created = order_queue.submit(account, {"volume": 0.01}, "key-1")
+    assert created is True
+    assert retry_created is False
+    assert retry is job
+
+    # Keys are per account, and orders without a key are never merged
+    other, other_created = order_queue.submit({"account_id": 2}, {}, "key-1")
+    assert other_created is True
+    assert other is not job
+    first, _ = order_queue.submit(account, {})
+    second, _ = order_queue.submit(account, {})
+    assert first is not second
+
+
+def test_done_callbacks_run_once_the_job_finishes(order_queue):
+    job, _ = order_queue.submit({"account_id": 1}, {})
+    assert job.done.wait(5)
+    assert job.status == "done"
+    assert job.result["success"] is False
+
+    called = []
+    job.on_done(lambda: called.append(True))
+    assert called == [True]
+
+
+# Accounts and tokens
+
+
+def test_memory_store_round_trip():
+    store = MemoryAccountStore()
+    asyncio.run(store.save("api", "token", 1000, "secret", "FakeBroker-Demo"))
+    account = asyncio.run(store.find_by_token("token"))
+    assert account == {
+        "api_id": "api",
+        "account_id": 1000,
+        "password": "secret",
+        "broker_name": "FakeBroker-Demo",
+    }
+    assert asyncio.run(store.find_by_token("other")) is None
+
+
+def test_relogin_invalidates_the_old_token():
+    assert mt5.save_account_token("api-7", "old", 7, "secret", "Broker") is None
+    assert mt5.save_account_token("api-7", "new", 7, "secret", "Broker") is None
+    assert mt5.get_cached_account("old") is None
+    assert mt5.get_account_by_token("new")["account_id"] == 7
+
+
+def test_store_errors_are_not_credentials(monkeypatch):
+    def find_by_token(token):
+        raise RuntimeError("store down")
+
+    monkeypatch.setattr(account_store, "find_by_token", find_by_token)
+    token_info = mt5.get_account_by_token("unknown")
+    assert token_info["success"] is False
+
+    account, error = run_steps(
+        authenticate(Request({"Authorization": "unknown"})), {"auth": token_info}
+    )
+    assert account is None
+    assert error == (token_info, 200)
+
+
+def test_flask_routes_answer_store_errors(monkeypatch):
+    from app import create_app
+
+    def find_by_token(token):
+        raise RuntimeError("store down")
+
+    monkeypatch.setattr(account_store, "find_by_token", find_by_token)
+    client = create_app("production").test_client()
+    headers = {"Authorization": "unknown"}
+
+    response = client.get("/api/v1/account/get_positions", headers=headers)
+    assert response.get_json()["message"] == "Database error: store down"
+    response = client.post(
+        "/api/v1/account/place_order", headers=headers, json={"async": True}
+    )
+    assert response.status_code == 200
+    assert response.get_json()["success"] is False
+    assert None not in terminal_pool.assignments
+
+
+def test_authenticate_rejects_missing_and_unknown_tokens():
+    account, error = run_steps(authenticate(Request({})), {})
+    assert error[1] == 400
+
+    account, error = run_steps(
+        authenticate(Request({"Authorization": "unknown"})), {"auth": None}
+    )
+    assert error == ({"error": "Invalid token: need to re-login"}, 400)